@@ -1,7 +1,10 @@
 # AI Script Models - Pydantic schemas for AI-driven editing
 
+from __future__ import annotations
+
 from pydantic import BaseModel, Field, model_validator
-from typing import List, Dict, Optional, Literal, Any
+from typing import List, Dict, Optional, Literal, Any, Annotated
+from typing_extensions import TypedDict
 
 # ============================================================================
 # Effect Models
@@ -70,11 +73,11 @@ class AudioSegment(BaseModel):
     action: Literal['boost', 'reduce', 'denoise'] = 'boost'
     intensity: float = Field(default=0.5, ge=0.0, le=1.0)
 
-class BackgroundMusic(BaseModel):
-    """Background music settings"""
-    enabled: bool = False
-    volume: float = Field(default=0.3, ge=0.0, le=1.0)
-    duckingIntensity: float = Field(default=0.7, ge=0.0, le=1.0)
+class BackgroundMusic(TypedDict, total=False):
+    """Background music settings (payload only, never read by processors)"""
+    enabled: bool
+    volume: Annotated[float, Field(ge=0.0, le=1.0)]
+    duckingIntensity: Annotated[float, Field(ge=0.0, le=1.0)]
 
 class AudioConfig(BaseModel):
     """Audio processing configuration"""
@@ -86,10 +89,16 @@ class AudioConfig(BaseModel):
 # Visual Models
 # ============================================================================
 
+class ColorParams(BaseModel):
+    """Custom color grading parameters (FFmpeg eq filter)"""
+    contrast: float = 1.0
+    saturation: float = 1.0
+    brightness: float = 0.0
+
 class ColorGrading(BaseModel):
     """Color grading configuration"""
     preset: Literal['vibrant', 'cinematic', 'natural', 'custom'] = 'vibrant'
-    customParams: Optional[Dict[str, float]] = None
+    customParams: Optional[ColorParams] = None
 
 class AspectRatio(BaseModel):
     """Aspect ratio conversion settings"""
@@ -138,12 +147,110 @@ class ContentMetadata(BaseModel):
     pacing: Literal['fast', 'medium', 'slow'] = 'medium'
     targetAudience: Literal['general', 'professional', 'young'] = 'general'
 
-class Recommendations(BaseModel):
-    """AI recommendations"""
-    targetDuration: Optional[float] = None
-    suggestedThumbnailTimestamp: Optional[float] = None
-    qualityScore: int = Field(default=75, ge=0, le=100)
-    improvementSuggestions: List[str] = Field(default_factory=list)
+class Recommendations(TypedDict, total=False):
+    """AI recommendations (payload only, never read by processors)"""
+    targetDuration: Optional[float]
+    suggestedThumbnailTimestamp: Optional[float]
+    qualityScore: Annotated[int, Field(ge=0, le=100)]
+    improvementSuggestions: List[str]
+
+# Zoom factor per AI intensity level
+_ZOOM_FACTORS = {
+    'subtle': 1.05,
+    'medium': 1.15,
+    'strong': 1.25
+}
+
+# FFmpeg zoom curves, formatted with s=start, e=end, z=zoom, d=duration
+_EASING_CURVES = {
+    'linear': 'if(between(t,{s},{e}),{z},1)',
+    'ease-in': 'if(between(t,{s},{e}),1+({z}-1)*pow((t-{s})/{d},2),1)',
+    'ease-out': 'if(between(t,{s},{e}),1+({z}-1)*(1-pow(1-(t-{s})/{d},2)),1)',
+    'ease-in-out': 'if(between(t,{s},{e}),if(lt((t-{s})/{d},0.5),1+({z}-1)*2*pow((t-{s})/{d},2),1+({z}-1)*(1-pow(-2*((t-{s})/{d})+2,2)/2)),1)'
+}
+
+# ============================================================================
+# Old Format Migration
+# ============================================================================
+
+_OLD_FORMAT_KEYS = ('jumpCuts', 'highlights')
+_REQUIRED_SECTIONS = ('metadata', 'audio', 'visual', 'timeline', 'recommendations')
+
+# Shared by every converted highlight; validation copies it into models
+_DEFAULT_ZOOM_EFFECTS = {
+    'zoom': {
+        'intensity': 'medium',
+        'easing': 'ease-in-out',
+        'duration': 1.0
+    }
+}
+
+def migrate_old_format(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rewrite an old frontend payload in place to the new script structure"""
+    # Fast path: payload is already in the new format
+    if (not isinstance(data.get('subtitles'), list)
+            and not any(k in data for k in _OLD_FORMAT_KEYS)
+            and all(k in data for k in _REQUIRED_SECTIONS)):
+        return data
+    
+    # Convert old subtitles format (array) to new format (object)
+    if isinstance(data.get('subtitles'), list):
+        data['subtitles'] = {
+            'segments': data['subtitles'],
+            'style': {},
+            'keywords': data.get('keywords', [])
+        }
+    
+    # Convert old highlights to timeline.highlights with default zoom effect
+    highlights = data.pop('highlights', None)
+    if isinstance(highlights, list):
+        timeline = data.setdefault('timeline', {})
+        if isinstance(timeline, dict):
+            timeline['highlights'] = [
+                {
+                    'start': h.get('start', 0),
+                    'end': h.get('end', 0),
+                    'reason': h.get('reason', ''),
+                    'effects': _DEFAULT_ZOOM_EFFECTS
+                }
+                for h in highlights
+            ]
+    elif highlights is not None:
+        data['highlights'] = highlights
+    
+    # Convert old jumpCuts to timeline.cuts
+    jump_cuts = data.pop('jumpCuts', None)
+    if isinstance(jump_cuts, list):
+        timeline = data.setdefault('timeline', {})
+        if isinstance(timeline, dict):
+            timeline['cuts'] = [
+                {
+                    'start': c.get('start', 0),
+                    'end': c.get('end', 0),
+                    'reason': c.get('reason', ''),
+                    'type': 'silence'
+                }
+                for c in jump_cuts
+            ]
+    elif jump_cuts is not None:
+        data['jumpCuts'] = jump_cuts
+    
+    # Set defaults for missing fields
+    data.setdefault('metadata', {})
+    if 'audio' not in data:
+        data['audio'] = {
+            'normalization': {'enabled': True, 'targetLoudness': -16},
+            'segments': []
+        }
+    if 'visual' not in data:
+        data['visual'] = {
+            'colorGrading': {'preset': data.get('color_grading', 'vibrant')},
+            'aspectRatio': {'target': '9:16', 'strategy': 'center_crop'}
+        }
+    data.setdefault('timeline', {})
+    data.setdefault('recommendations', {})
+    
+    return data
 
 # ============================================================================
 # Main AI Editing Script
@@ -157,104 +264,23 @@ class AIEditingScript(BaseModel):
     audio: AudioConfig = Field(default_factory=AudioConfig)
     visual: VisualConfig = Field(default_factory=VisualConfig)
     subtitles: SubtitleConfig = Field(default_factory=SubtitleConfig)
-    recommendations: Recommendations = Field(default_factory=Recommendations)
+    recommendations: Recommendations = Field(default_factory=dict)
     
     @model_validator(mode='before')
     @classmethod
     def convert_old_format(cls, data: Any) -> Any:
         """Convert old frontend format to new structure"""
         if isinstance(data, dict):
-            # Convert old subtitles format (array) to new format (object)
-            if 'subtitles' in data and isinstance(data['subtitles'], list):
-                data['subtitles'] = {
-                    'segments': data['subtitles'],
-                    'style': {},
-                    'keywords': data.get('keywords', [])
-                }
-            
-            # Convert old highlights format if needed
-            if 'highlights' in data and isinstance(data['highlights'], list):
-                # Wrap in timeline if not already
-                if 'timeline' not in data:
-                    data['timeline'] = {}
-                if isinstance(data['timeline'], dict):
-                    # Convert old highlights to new format with effects
-                    new_highlights = []
-                    for h in data['highlights']:
-                        new_highlights.append({
-                            'start': h.get('start', 0),
-                            'end': h.get('end', 0),
-                            'reason': h.get('reason', ''),
-                            'effects': {
-                                'zoom': {
-                                    'intensity': 'medium',
-                                    'easing': 'ease-in-out',
-                                    'duration': 1.0
-                                }
-                            }
-                        })
-                    data['timeline']['highlights'] = new_highlights
-                del data['highlights']
-            
-            # Convert old jumpCuts to timeline.cuts
-            if 'jumpCuts' in data and isinstance(data['jumpCuts'], list):
-                if 'timeline' not in data:
-                    data['timeline'] = {}
-                if isinstance(data['timeline'], dict):
-                    data['timeline']['cuts'] = [
-                        {
-                            'start': c.get('start', 0),
-                            'end': c.get('end', 0),
-                            'reason': c.get('reason', ''),
-                            'type': 'silence'
-                        }
-                        for c in data['jumpCuts']
-                    ]
-                del data['jumpCuts']
-            
-            # Set defaults for missing fields
-            if 'metadata' not in data:
-                data['metadata'] = {}
-            
-            if 'audio' not in data:
-                data['audio'] = {
-                    'normalization': {'enabled': True, 'targetLoudness': -16},
-                    'segments': []
-                }
-            
-            if 'visual' not in data:
-                data['visual'] = {
-                    'colorGrading': {'preset': data.get('color_grading', 'vibrant')},
-                    'aspectRatio': {'target': '9:16', 'strategy': 'center_crop'}
-                }
-            
-            if 'timeline' not in data:
-                data['timeline'] = {}
-            
-            if 'recommendations' not in data:
-                data['recommendations'] = {}
-        
+            return migrate_old_format(data)
         return data
     
     # Helper methods
-    def get_zoom_factor(self, intensity: str) -> float:
+    @staticmethod
+    def get_zoom_factor(intensity: str) -> float:
         """Convert AI intensity to zoom factor"""
-        mapping = {
-            'subtle': 1.05,
-            'medium': 1.15,
-            'strong': 1.25
-        }
-        return mapping.get(intensity, 1.15)
+        return _ZOOM_FACTORS.get(intensity, 1.15)
     
     def get_easing_expression(self, easing: str, start: float, end: float, zoom: float) -> str:
         """Generate FFmpeg easing expression"""
-        duration = end - start
-        
-        curves = {
-            'linear': f'if(between(t,{start},{end}),{zoom},1)',
-            'ease-in': f'if(between(t,{start},{end}),1+({zoom}-1)*pow((t-{start})/{duration},2),1)',
-            'ease-out': f'if(between(t,{start},{end}),1+({zoom}-1)*(1-pow(1-(t-{start})/{duration},2)),1)',
-            'ease-in-out': f'if(between(t,{start},{end}),if(lt((t-{start})/{duration},0.5),1+({zoom}-1)*2*pow((t-{start})/{duration},2),1+({zoom}-1)*(1-pow(-2*((t-{start})/{duration})+2,2)/2)),1)'
-        }
-        
-        return curves.get(easing, curves['linear'])
+        template = _EASING_CURVES.get(easing, _EASING_CURVES['linear'])
+        return template.format(s=start, e=end, z=zoom, d=end - start)
@@ -1,10 +1,29 @@
-import ffmpeg
+import json
+import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def check_audio(video_path):
-    """Check if video has audio stream"""
+def probe_video(video_path):
+    """Run ffprobe once and return its parsed JSON output"""
+    raw = subprocess.check_output(
+        [
+            'ffprobe', '-v', 'error', '-print_format', 'json',
+            '-show_entries',
+            'format=format_name,duration:'
+            'stream=codec_type,codec_name,width,height,channels,sample_rate',
+            str(video_path)
+        ],
+        stderr=subprocess.PIPE
+    )
+    return json.loads(raw)
+
+def check_audio(video_path, probe=None):
+    """Check if video has audio stream (probe: probe_video() result, or the exception it raised)"""
     try:
-        probe = ffmpeg.probe(video_path)
+        if probe is None:
+            probe = probe_video(video_path)
+        elif isinstance(probe, Exception):
+            raise probe
         
         print(f"=== Video Info: {video_path} ===")
         print(f"Format: {probe['format']['format_name']}")
@@ -35,9 +54,26 @@ def check_audio(video_path):
         print(f"Error: {e}")
         return False
 
+def _safe_probe(video_path):
+    """probe_video(), returning the error instead of raising it"""
+    try:
+        return probe_video(video_path)
+    except Exception as e:
+        return e
+
+def check_audio_many(video_paths, max_workers=16):
+    """Probe several videos concurrently, then report them in order"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        probes = list(pool.map(_safe_probe, video_paths))
+        
+    return [check_audio(path, probe) for path, probe in zip(video_paths, probes)]
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: py check_audio.py <video_file>")
+        print("Usage: py check_audio.py <video_file> [<video_file> ...]")
         sys.exit(1)
-    
-    check_audio(sys.argv[1])
+        
+    if len(sys.argv) == 2:
+        check_audio(sys.argv[1])
+    else:
+        check_audio_many(sys.argv[1:])
@@ -0,0 +1,418 @@
+# FFmpeg Utilities - Shared helpers for probing and running FFmpeg
+
+import ffmpeg
+import json
+import logging
+import os
+import psutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+# libx264 speed/size trade-off for every software encode (AUTOCUT_X264_PRESET overrides)
+X264_PRESET = os.environ.get("AUTOCUT_X264_PRESET", "veryfast")
+
+# Output encoder settings per detect_hardware_accel() result (None = software)
+_VIDEO_ENCODERS = {
+    None: {'vcodec': 'libx264', 'preset': X264_PRESET},
+    'cuda': {'vcodec': 'h264_nvenc', 'preset': 'p4', 'tune': 'hq', 'rc': 'vbr', 'cq': 23},
+    'qsv': {'vcodec': 'h264_qsv', 'preset': 'veryfast'},
+    'amf': {'vcodec': 'h264_amf', 'quality': 'speed', 'rc': 'cqp', 'qp_i': 23, 'qp_p': 23},
+    'videotoolbox': {'vcodec': 'h264_videotoolbox', 'b:v': '8M'},
+    'vaapi': {'vcodec': 'h264_vaapi', 'qp': 23},
+}
+
+# Lines of ffmpeg's stderr kept for the error raised when a run fails
+STDERR_TAIL_LINES = 50
+
+# Seconds an ffmpeg run may go without its output time advancing or using
+# CPU before it is killed as stuck (AUTOCUT_FFMPEG_STALL_TIMEOUT overrides,
+# 0 disables). CPU counts because while select drops a long cut, ffmpeg
+# keeps decoding but its output time stands still
+FFMPEG_STALL_TIMEOUT = float(os.environ.get("AUTOCUT_FFMPEG_STALL_TIMEOUT", "60"))
+
+# CPU seconds ffmpeg must use between two (1s apart) stall checks to count as working
+STALL_CPU_SECONDS = 0.01
+
+# Filter options whose graph is read from a file instead once it gets long:
+# a single argv string is limited to 128 KiB on Linux (E2BIG), which a
+# select expression over thousands of cuts can exceed
+FILTER_SCRIPT_OPTIONS = {
+    '-filter_complex': '-filter_complex_script',
+    '-vf': '-filter_script:v',
+    '-af': '-filter_script:a',
+}
+FILTER_SCRIPT_MIN_LENGTH = 16 * 1024
+
+# Render node used for VAAPI decode, upload and encode
+VAAPI_DEVICE = '/dev/dri/renderD128'
+
+
+# Output options for the staged path's libx264 re-encodes: all cores, fast
+# preset, and intermediates that are cheap for the next stage to decode
+ENCODE_OPTS = {'threads': 0, 'preset': X264_PRESET, 'tune': 'fastdecode', 'loglevel': 'error'}
+
+
+# Only the fields the pipeline reads; keeps ffprobe's output (and parsing) small
+_PROBE_ENTRIES = 'stream=codec_type,width,height,duration,avg_frame_rate,r_frame_rate:format=duration'
+
+# Fields probe_video returns (a sidecar saved without any of them is probed again)
+_PROBE_FIELDS = frozenset(('width', 'height', 'duration', 'fps', 'has_audio'))
+
+
+def probe_sidecar(path: Union[str, Path]) -> Path:
+    """Where probe_video persists a file's probe results (next to the file)"""
+    path = Path(path)
+    return path.with_name(path.name + '.mediainfo.json')
+
+
+@lru_cache(maxsize=64)
+def _probe_cached(path: str, mtime_ns: int, size: int) -> dict:
+    """Probe a file once per (path, mtime, size) version, reusing a matching sidecar"""
+    sidecar = probe_sidecar(path)
+    try:
+        saved = json.loads(sidecar.read_text())
+        if saved['mtime_ns'] == mtime_ns and saved['size'] == size and _PROBE_FIELDS <= saved['info'].keys():
+            return saved['info']
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    info = _run_probe(path)
+
+    # Best effort: a missing sidecar only costs a probe after a restart
+    try:
+        sidecar.write_text(json.dumps({'mtime_ns': mtime_ns, 'size': size, 'info': info}))
+    except OSError as e:
+        logger.debug(f"Could not write probe sidecar {sidecar}: {e}")
+    return info
+
+
+def _run_probe(path: str) -> dict:
+    """Run ffprobe and extract the fields probe_video returns"""
+    raw = subprocess.run(
+        [
+            'ffprobe', '-v', 'error',
+            '-show_entries', _PROBE_ENTRIES,
+            '-of', 'json',
+            path
+        ],
+        capture_output=True,
+        check=True
+    ).stdout
+    probe = json.loads(raw)
+
+    video_stream = next(s for s in probe['streams'] if s.get('codec_type') == 'video')
+    return {
+        'width': int(video_stream['width']),
+        'height': int(video_stream['height']),
+        'duration': float(video_stream.get('duration', probe['format']['duration'])),
+        'fps': _frame_rate(video_stream),
+        'has_audio': any(s.get('codec_type') == 'audio' for s in probe['streams'])
+    }
+
+
+def _frame_rate(stream: dict) -> float:
+    """Average frame rate of a probed stream (its base rate if no average, 30 if neither)"""
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        num, _, den = stream.get(key, '0/0').partition('/')
+        if float(num or 0) > 0 and float(den or 0) > 0:
+            return float(num) / float(den)
+    return 30.0
+
+
+def probe_video(path: Union[str, Path]) -> dict:
+    """
+    Get video width, height, duration, frame rate and whether it has audio
+
+    Results are cached per file version, so probing the same unchanged
+    file again (retries, several processors) doesn't spawn ffprobe. They
+    are also saved to a sidecar file (see probe_sidecar), so a restarted
+    worker doesn't probe again either.
+
+    Returns:
+        {'width': int, 'height': int, 'duration': float, 'fps': float, 'has_audio': bool}
+    """
+    st = os.stat(path)
+    return dict(_probe_cached(str(path), st.st_mtime_ns, st.st_size))
+
+
+@lru_cache(maxsize=64)
+def _keyframes_cached(path: str, mtime_ns: int, size: int) -> Tuple[float, ...]:
+    """Video keyframe times of one file version"""
+    # Packet flags come from the demuxer, so nothing is decoded
+    raw = subprocess.run(
+        [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0',
+            path
+        ],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+
+    keyframes = []
+    for line in raw.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if flags.startswith('K') and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    return tuple(sorted(keyframes))
+
+
+def probe_keyframes(path: Union[str, Path]) -> Tuple[float, ...]:
+    """Sorted keyframe times (seconds) of a video's first video stream"""
+    st = os.stat(path)
+    return _keyframes_cached(str(path), st.st_mtime_ns, st.st_size)
+
+
+def _filter_scripts(args: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    ffmpeg arguments with long filter graphs moved into script files
+
+    Returns:
+        (new arguments, script file paths for the caller to delete)
+    """
+    new_args, scripts = [], []
+    i = 0
+    while i < len(args):
+        option = args[i]
+        if (
+            option in FILTER_SCRIPT_OPTIONS
+            and i + 1 < len(args)
+            and len(args[i + 1]) >= FILTER_SCRIPT_MIN_LENGTH
+        ):
+            with tempfile.NamedTemporaryFile('w', suffix='.ffgraph', delete=False, encoding='utf-8') as f:
+                f.write(args[i + 1])
+            scripts.append(f.name)
+            new_args += [FILTER_SCRIPT_OPTIONS[option], f.name]
+            i += 2
+        else:
+            new_args.append(option)
+            i += 1
+    return new_args, scripts
+
+
+def run_ffmpeg(stream, input: Optional[bytes] = None) -> None:
+    """
+    Run an ffmpeg-python output stream, raising ffmpeg.Error on failure
+
+    stderr is drained on a reader thread while ffmpeg runs, keeping only
+    the last STDERR_TAIL_LINES lines, so the error carries ffmpeg's
+    message without buffering a verbose run's whole log. `input`, if
+    given, is written to ffmpeg's stdin (for a 'pipe:' input). Long
+    filter graphs are passed as script files (see FILTER_SCRIPT_OPTIONS).
+    """
+    args, scripts = _filter_scripts(stream.compile())
+    try:
+        _run_ffmpeg_args(args, input)
+    finally:
+        for script in scripts:
+            os.unlink(script)
+
+
+def _run_ffmpeg_args(args: List[str], input: Optional[bytes]) -> None:
+    """
+    Run ffmpeg with `args`, keeping the tail of its stderr for the error
+
+    ffmpeg reports its progress on stdout (-progress pipe:1); a run whose
+    output time doesn't advance and that uses no CPU for
+    FFMPEG_STALL_TIMEOUT seconds is killed.
+    """
+    process = subprocess.Popen(
+        [args[0], '-progress', 'pipe:1', '-nostats', *args[1:]],
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    tail = deque(maxlen=STDERR_TAIL_LINES)
+    progress = {'out_time': None, 'advanced_at': time.monotonic()}
+    readers = [
+        threading.Thread(target=tail.extend, args=(process.stderr,), daemon=True),
+        threading.Thread(target=_read_progress, args=(process.stdout, progress), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    if input is not None:
+        try:
+            process.stdin.write(input)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg exited without reading it all; its stderr says why
+            pass
+    stalled = _wait_unless_stalled(process, progress)
+    for reader in readers:
+        reader.join()
+    process.stdout.close()
+    process.stderr.close()
+    if stalled:
+        message = (
+            f"ffmpeg made no progress for {FFMPEG_STALL_TIMEOUT:g}s "
+            f"(output time {progress['out_time'] or 'none yet'}), killed it"
+        )
+        logger.warning(f"⚠️  {message}")
+        tail.append(f"{message}\n".encode())
+        raise ffmpeg.Error('ffmpeg', None, b''.join(tail))
+    if process.returncode:
+        raise ffmpeg.Error('ffmpeg', None, b''.join(tail))
+
+
+def _read_progress(stdout, progress: dict) -> None:
+    """Track ffmpeg's -progress output: the latest out_time and when it last changed"""
+    for line in stdout:
+        key, _, value = line.decode(errors='replace').strip().partition('=')
+        if key == 'out_time' and value != progress['out_time']:
+            progress['out_time'] = value
+            progress['advanced_at'] = time.monotonic()
+
+
+def _wait_unless_stalled(process: subprocess.Popen, progress: dict) -> bool:
+    """Wait for ffmpeg to exit; kill it and return True if it stalls (no output progress, no CPU)"""
+    if not FFMPEG_STALL_TIMEOUT:
+        process.wait()
+        return False
+    # Valid until the wait below reaps ffmpeg (an exited one stays a zombie)
+    ffmpeg_process = psutil.Process(process.pid)
+    cpu_used = 0.0
+    while True:
+        try:
+            process.wait(timeout=1)
+            return False
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            cpu_times = ffmpeg_process.cpu_times()
+        except psutil.Error:
+            # Exited since the wait; the next wait reaps it
+            continue
+        # Still decoding (e.g. frames select drops): busy, not stuck
+        previous, cpu_used = cpu_used, cpu_times.user + cpu_times.system
+        if cpu_used - previous > STALL_CPU_SECONDS:
+            progress['advanced_at'] = time.monotonic()
+        elif time.monotonic() - progress['advanced_at'] > FFMPEG_STALL_TIMEOUT:
+            process.kill()
+            process.wait()
+            return True
+
+
+def concat_copy(source: Union[str, Path], segments: Sequence[Tuple[float, float]], output: Union[str, Path]) -> None:
+    """Join (start, end) segments of one source with the concat demuxer, copying streams"""
+    # The list goes to ffmpeg's stdin; entries need the file: protocol,
+    # or they would be resolved relative to 'pipe:'
+    source = str(Path(source).absolute()).replace("'", "'\\''")
+    concat_list = ''.join(
+        f"file 'file:{source}'\ninpoint {start}\noutpoint {end}\n"
+        for start, end in segments
+    )
+
+    run_ffmpeg(
+        ffmpeg
+        .input('pipe:', format='concat', safe=0, protocol_whitelist='file,pipe')
+        .output(str(output), c='copy', loglevel='error')
+        .overwrite_output(),
+        input=concat_list.encode('utf-8')
+    )
+
+
+def video_decoder_options(hwaccel: Optional[str]) -> dict:
+    """
+    ffmpeg input options for hardware decoding
+
+    Frames are not kept on the GPU (no -hwaccel_output_format): the
+    filters in the chain are CPU filters, so FFmpeg downloads decoded
+    frames for them automatically.
+    """
+    if hwaccel is None:
+        return {}
+    if hwaccel == 'vaapi':
+        # -vaapi_device is global; it also gives hwupload its device
+        return {'hwaccel': 'vaapi', 'vaapi_device': VAAPI_DEVICE}
+    if hwaccel == 'amf':
+        # AMF only encodes; decode with whatever the platform offers (D3D11VA, VAAPI)
+        return {'hwaccel': 'auto'}
+    return {'hwaccel': hwaccel}
+
+
+def video_encoder_options(hwaccel: Optional[str]) -> dict:
+    """ffmpeg output options for the H.264 encoder matching the detected hardware"""
+    return dict(_VIDEO_ENCODERS.get(hwaccel, _VIDEO_ENCODERS[None]))
+
+
+def encode_options(hwaccel: Optional[str], crf: Optional[int] = None) -> dict:
+    """
+    Output options for a staged-path re-encode: the hwaccel's H.264 encoder,
+    or libx264 with ENCODE_OPTS (and `crf`, which only libx264 takes)
+
+    VAAPI stays on libx264 here: its encoder needs the frames uploaded to
+    the GPU, which only the single-pass render sets up.
+    """
+    if hwaccel is None or hwaccel == 'vaapi':
+        options = {'vcodec': 'libx264', **ENCODE_OPTS}
+        if crf is not None:
+            options['crf'] = crf
+        return options
+    return {**video_encoder_options(hwaccel), 'loglevel': 'error'}
+
+
+def run_encode(streams, filename: str, hwaccel: Optional[str], crf: Optional[int] = None, **kwargs) -> None:
+    """
+    Encode `streams` to `filename` with encode_options(hwaccel, crf) plus
+    `kwargs` (e.g. acodec), raising ffmpeg.Error on failure
+
+    A failed hardware encode is retried once on libx264, so a GPU or
+    driver problem can't make a staged step fail (or be skipped).
+    """
+    def encode(options: dict) -> None:
+        run_ffmpeg(ffmpeg.output(*streams, filename, **kwargs, **options).overwrite_output())
+
+    options = encode_options(hwaccel, crf)
+    if options['vcodec'] == 'libx264':
+        encode(options)
+        return
+    try:
+        encode(options)
+    except ffmpeg.Error as e:
+        logger.warning(
+            f"⚠️  {options['vcodec']} encode failed, retrying with libx264: "
+            f"{e.stderr.decode(errors='replace') if e.stderr else e}"
+        )
+        encode(encode_options(None, crf))
+
+
+def prepare_for_encoder(video, hwaccel: Optional[str]):
+    """Final filters a video stream needs before the hwaccel's encoder (VAAPI takes GPU frames)"""
+    if hwaccel == 'vaapi':
+        return video.filter('format', 'nv12').filter('hwupload')
+    return video
+
+
+def h264_encoder_works(hwaccel: Optional[str]) -> bool:
+    """Whether the hwaccel's H.264 encoder can actually encode here (a few blank frames)"""
+    source = ffmpeg.input(
+        'color=c=black:s=256x256:d=0.1',
+        format='lavfi',
+        **{k: v for k, v in video_decoder_options(hwaccel).items() if k != 'hwaccel'}
+    )
+    try:
+        run_ffmpeg(
+            ffmpeg
+            .output(
+                prepare_for_encoder(source, hwaccel),
+                '-',
+                format='null',
+                loglevel='error',
+                **video_encoder_options(hwaccel)
+            )
+        )
+        return True
+    except (ffmpeg.Error, OSError):
+        return False
@@ -0,0 +1,203 @@
+# Job Store - Bounded job status tracking (in-memory or shared SQLite)
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Generic, Iterator, Optional, Tuple, Type, TypeVar, Union
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar('V')
+M = TypeVar('M', bound=BaseModel)
+
+
+class JobStatusStore(Generic[V]):
+    """
+    Thread-safe LRU store for job statuses.
+
+    Holds at most `maxsize` jobs and forgets entries that have not been
+    written for `ttl` seconds, so a long-running worker does not keep
+    every finished job forever. Entries `is_active` returns True for
+    (jobs still running, which may go a long time between writes) don't
+    expire. Supports the dict operations the API uses (`in`, `[]`,
+    `del`, `get`).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 3600.0,
+        is_active: Optional[Callable[[V], bool]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.is_active = is_active
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, stamp: float, value: V, now: float) -> bool:
+        return now - stamp > self.ttl and not (self.is_active and self.is_active(value))
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries from the cold end, then trim to maxsize"""
+        while self._data:
+            key, (stamp, value) = next(iter(self._data.items()))
+            if len(self._data) > self.maxsize or self._expired(stamp, value, now):
+                del self._data[key]
+                logger.debug(f"🗑️ Evicted job status: {key}")
+            elif now - stamp <= self.ttl:
+                break
+            else:
+                # Still active past the TTL: restamp it so the sweep can go on
+                self._data[key] = (now, value)
+                self._data.move_to_end(key)
+
+    def __setitem__(self, job_id: str, value: V) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[job_id] = (now, value)
+            self._data.move_to_end(job_id)
+            self._evict(now)
+
+    def __getitem__(self, job_id: str) -> V:
+        value = self.get(job_id)
+        if value is None:
+            raise KeyError(job_id)
+        return value
+
+    def __delitem__(self, job_id: str) -> None:
+        with self._lock:
+            del self._data[job_id]
+
+    def __contains__(self, job_id: object) -> bool:
+        return self.get(job_id) is not None  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._data))
+
+    def get(self, job_id: str, default: Optional[V] = None) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(job_id)
+            if entry is None:
+                return default
+            stamp, value = entry
+            if self._expired(stamp, value, now):
+                del self._data[job_id]
+                return default
+            return value
+
+    def pop(self, job_id: str, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(job_id, None)
+        return default if entry is None else entry[1]
+
+
+class SqliteJobStatusStore(Generic[M]):
+    """
+    Job status store backed by a SQLite table in WAL mode.
+
+    Every server process that opens the same file sees the same jobs,
+    so `/status` answers correctly whichever worker took the upload.
+    Statuses are pydantic models stored as JSON; rows not written for
+    `ttl` seconds are ignored on read and deleted by `purge_expired()`.
+    """
+
+    def __init__(self, path: Union[str, Path], model: Type[M], ttl: float = 86400.0):
+        self.path = Path(path)
+        self.model = model
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        This process's connection, opened on first use (call with the lock held)
+
+        Nothing is opened at construction (e.g. module import), and a forked
+        child opens its own instead of using its parent's.
+        """
+        if self._conn is None or self._conn_pid != os.getpid():
+            # Autocommit: every write is its own short transaction
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def __setitem__(self, job_id: str, value: M) -> None:
+        data = value.model_dump_json()
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job_id, data, time.time())
+            )
+
+    def __getitem__(self, job_id: str) -> M:
+        value = self.get(job_id)
+        if value is None:
+            raise KeyError(job_id)
+        return value
+
+    def __delitem__(self, job_id: str) -> None:
+        with self._lock:
+            deleted = self._connection().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,)).rowcount
+        if not deleted:
+            raise KeyError(job_id)
+
+    def __contains__(self, job_id: object) -> bool:
+        return self.get_json(job_id) is not None  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT COUNT(*) FROM jobs WHERE updated_at >= ?", (time.time() - self.ttl,)
+            ).fetchone()
+        return row[0]
+
+    def get_json(self, job_id: str) -> Optional[str]:
+        """Stored JSON for a job, without building the model (None if missing/expired)"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT data FROM jobs WHERE job_id = ? AND updated_at >= ?",
+                (job_id, time.time() - self.ttl)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def get(self, job_id: str, default: Optional[M] = None) -> Optional[M]:
+        data = self.get_json(job_id)
+        if data is None:
+            return default
+        return self.model.model_validate_json(data)
+
+    def purge_expired(self) -> int:
+        """Delete rows older than the TTL, returning how many were removed"""
+        with self._lock:
+            removed = self._connection().execute(
+                "DELETE FROM jobs WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if removed:
+            logger.info(f"🗑️ Purged {removed} expired job statuses")
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
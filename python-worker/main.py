@@ -1,15 +1,24 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from __future__ import annotations
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
-import json
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+import asyncio
+import ffmpeg
 import os
 import shutil
 import logging
 from pathlib import Path
 from datetime import datetime
 from video_processor import VideoProcessor, ProcessingOptions
+from job_store import JobStatusStore
+from ffmpeg_utils import probe_sidecar
+from performance_utils import detect_hardware_accel, get_ffmpeg_version, save_upload
 
 # Setup logging
 logging.basicConfig(
@@ -42,6 +51,16 @@ TEMP_DIR = BASE_DIR / "temp"
 TEMP_DIR.mkdir(exist_ok=True)
 (TEMP_DIR / "uploads").mkdir(exist_ok=True)
 (TEMP_DIR / "outputs").mkdir(exist_ok=True)
+(TEMP_DIR / "processing").mkdir(exist_ok=True)
+
+# Created above and never removed while running, so checked once
+DIRECTORIES = {
+    name: (TEMP_DIR / name).is_dir()
+    for name in ("uploads", "processing", "outputs")
+}
+
+# Uploads still in memory are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 class EditingScript(BaseModel):
     """Editing script from AI analysis"""
@@ -54,6 +73,7 @@ class EditingScript(BaseModel):
     color_grading: Optional[str] = Field(default="vibrant", description="Color grading: vibrant, cinematic, natural")
     enable_zoom: Optional[bool] = Field(default=True, description="Enable zoom effects on highlights")
     enable_transitions: Optional[bool] = Field(default=True, description="Enable smooth transitions")
+    snap_cuts_to_keyframes: Optional[bool] = Field(default=False, description="Start kept segments on keyframes so jump cuts can be stream-copied")
 
 class ProcessingStatus(BaseModel):
     """Processing status response"""
@@ -72,31 +92,24 @@ class HealthResponse(BaseModel):
     directories: Dict
     version: str
 
-# In-memory job status tracking
-job_status: Dict[str, ProcessingStatus] = {}
+# Video jobs run here instead of on the event loop
+pipeline_executor = ThreadPoolExecutor(
+    max_workers=os.cpu_count(),
+    thread_name_prefix="pipeline"
+)
 
-@app.get("/", response_model=Dict)
+# In-memory job status tracking (bounded, finished jobs expire after an hour;
+# running ones don't, since process_all writes no status while it renders)
+job_status: JobStatusStore[ProcessingStatus] = JobStatusStore(
+    maxsize=10000,
+    ttl=3600,
+    is_active=lambda status: status.status in ("uploading", "processing")
+)
+
+@app.get("/", response_model=HealthResponse)
 def read_root():
     """Detailed health check"""
-    import subprocess
-    
-    # Check FFmpeg
-    try:
-        result = subprocess.run(
-            ["ffmpeg", "-version"], 
-            capture_output=True, 
-            text=True,
-            check=True,
-            timeout=5
-        )
-        ffmpeg_status = "installed"
-        ffmpeg_version = result.stdout.split('\n')[0]
-    except subprocess.TimeoutExpired:
-        ffmpeg_status = "timeout"
-        ffmpeg_version = "FFmpeg check timed out"
-    except Exception as e:
-        ffmpeg_status = "not found"
-        ffmpeg_version = str(e)
+    ffmpeg_status, ffmpeg_version = get_ffmpeg_version()
     
     return HealthResponse(
         status="healthy",
@@ -105,17 +118,164 @@ def read_root():
             "version": ffmpeg_version
         },
         temp_dir=str(TEMP_DIR),
-        directories={
-            "uploads": (TEMP_DIR / "uploads").exists(),
-            "processing": (TEMP_DIR / "processing").exists(),
-            "outputs": (TEMP_DIR / "outputs").exists()
-        },
+        directories=DIRECTORIES,
         version="2.0.0"
     )
 
+def _update_status(current: ProcessingStatus, /, **changes) -> ProcessingStatus:
+    """
+    Publish a job's status changes as one new snapshot
+    
+    Readers (/status) either see the previous status or the new one,
+    never a half-applied update.
+    """
+    status = current.model_copy(update=changes)
+    job_status[status.job_id] = status
+    return status
+
+def _run_pipeline(
+    script: EditingScript,
+    status: ProcessingStatus,
+    input_path: Path
+) -> Tuple[str, int]:
+    """
+    Run the editing steps for one job, publishing its progress
+    
+    Blocking (FFmpeg), so it is executed on pipeline_executor.
+    
+    Returns:
+        Tuple of (final video path, number of steps run)
+    """
+    # Initialize processor with options
+    output_path = TEMP_DIR / "outputs" / f"{script.job_id}_output.mp4"
+    options = ProcessingOptions(
+        subtitle_style=script.style,
+        color_grading=script.color_grading,
+        enable_zoom=script.enable_zoom,
+        enable_transitions=script.enable_transitions,
+        snap_cuts_to_keyframes=script.snap_cuts_to_keyframes
+    )
+    # Probed once per process (cached); hardware doesn't change while the server runs
+    processor = VideoProcessor(str(input_path), str(output_path), options, hwaccel=detect_hardware_accel())
+    total_steps = 5
+    
+    # All steps as one filter graph: the source is decoded and encoded once
+    status = _update_status(
+        status,
+        current_step="Rendering jump cuts, effects, subtitles and 9:16 format...",
+        progress=20
+    )
+    logger.info("⚡ Rendering all steps in a single FFmpeg pass")
+    try:
+        final_path = processor.process_all(
+            script.jumpCuts, script.subtitles, keywords=script.keywords, highlights=script.highlights
+        )
+    except ffmpeg.Error:
+        logger.warning("⚠️  Single-pass render failed, falling back to step-by-step processing")
+        final_path = None
+    
+    if final_path is None:
+        final_path, status = _run_steps(processor, script, status, total_steps)
+    logger.info(f"✅ Video processed successfully: {final_path}")
+    
+    # Update final status
+    _update_status(
+        status,
+        status="completed",
+        progress=100,
+        current_step="Processing complete!",
+        message=f"Video processed successfully in {total_steps} steps"
+    )
+    
+    return final_path, total_steps
+
+def _run_steps(
+    processor: VideoProcessor,
+    script: EditingScript,
+    status: ProcessingStatus,
+    total_steps: int
+) -> Tuple[str, ProcessingStatus]:
+    """
+    Run the editing steps one FFmpeg pass at a time, publishing each step
+    
+    Returns:
+        Tuple of (final video path, latest status)
+    """
+    current_video = str(processor.input_path)
+    current_step_num = 0
+    
+    # Cuts snapped to keyframes keep extra frames; move what's timed after them along
+    highlights = processor.align_to_cuts(script.jumpCuts, script.highlights)
+    subtitles = processor.align_to_cuts(script.jumpCuts, script.subtitles)
+    
+    # Step 1: Apply jump cuts with smooth transitions
+    if script.jumpCuts and len(script.jumpCuts) > 0:
+        current_step_num += 1
+        status = _update_status(
+            status,
+            current_step=f"Applying {len(script.jumpCuts)} jump cuts...",
+            progress=int((current_step_num / total_steps) * 100)
+        )
+        logger.info(f"✂️  Step {current_step_num}/{total_steps}: Applying jump cuts")
+        
+        current_video = processor.apply_jump_cuts(script.jumpCuts)
+        logger.info(f"✅ Jump cuts applied")
+    
+    # Step 2: Add zoom effects on highlights
+    if script.enable_zoom and script.highlights and len(script.highlights) > 0:
+        current_step_num += 1
+        status = _update_status(
+            status,
+            current_step=f"Adding zoom effects at {len(script.highlights)} moments...",
+            progress=int((current_step_num / total_steps) * 100)
+        )
+        logger.info(f"🔍 Step {current_step_num}/{total_steps}: Adding zoom effects")
+        
+        current_video = processor.add_zoom_effects(current_video, highlights)
+        logger.info(f"✅ Zoom effects added")
+    
+    # Step 3: Apply color grading (folded into the next encode: subtitles,
+    # or the aspect ratio conversion, rather than a pass of its own)
+    current_step_num += 1
+    status = _update_status(
+        status,
+        current_step=f"Applying {script.color_grading} color grading...",
+        progress=int((current_step_num / total_steps) * 100)
+    )
+    logger.info(f"🎨 Step {current_step_num}/{total_steps}: Color grading")
+    
+    pending_color_grading = script.color_grading
+    
+    # Step 4: Add professional subtitles
+    if script.subtitles and len(script.subtitles) > 0:
+        current_step_num += 1
+        status = _update_status(
+            status,
+            current_step=f"Adding {len(script.subtitles)} subtitles ({script.style} style)...",
+            progress=int((current_step_num / total_steps) * 100)
+        )
+        logger.info(f"💬 Step {current_step_num}/{total_steps}: Adding subtitles")
+        
+        current_video = processor.add_subtitles(
+            subtitles, current_video, keywords=script.keywords, color_grading=pending_color_grading
+        )
+        pending_color_grading = None
+        logger.info(f"✅ Subtitles added")
+    
+    # Step 5: Convert to 9:16 with blurred background
+    current_step_num += 1
+    status = _update_status(
+        status,
+        current_step="Converting to 9:16 format...",
+        progress=int((current_step_num / total_steps) * 100)
+    )
+    logger.info(f"📐 Step {current_step_num}/{total_steps}: Converting aspect ratio")
+    
+    final_path = processor.convert_aspect_ratio(current_video, color_grading=pending_color_grading)
+    return final_path, status
+
 @app.post("/process", response_class=FileResponse)
 async def process_video(
-    background_tasks: BackgroundTasks,
     video: UploadFile = File(..., description="Input video file"),
     editing_script: str = Form(..., description="JSON editing script")
 ):
@@ -135,16 +295,21 @@ async def process_video(
     """
     job_id = None
     input_path = None
+    status = None
     
     try:
         # Parse and validate editing script
         try:
-            script_data = json.loads(editing_script)
-            script = EditingScript(**script_data)
-        except json.JSONDecodeError as e:
+            script = EditingScript.model_validate_json(editing_script)
+        except ValidationError as e:
+            if any(err['type'] == 'json_invalid' for err in e.errors()):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid JSON in editing script: {str(e)}"
+                )
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid JSON in editing script: {str(e)}"
+                detail=f"Invalid editing script format: {str(e)}"
             )
         except Exception as e:
             raise HTTPException(
@@ -155,13 +320,14 @@ async def process_video(
         job_id = script.job_id
         logger.info(f"📥 Starting job: {job_id}")
         
-        # Initialize job status
-        job_status[job_id] = ProcessingStatus(
+        # Initialize job status (trusted literals, no validation needed)
+        status = ProcessingStatus.model_construct(
             job_id=job_id,
             status="uploading",
             progress=0,
             current_step="Uploading video..."
         )
+        job_status[job_id] = status
         
         # Validate video file
         if not video.content_type or not video.content_type.startswith('video/'):
@@ -172,96 +338,41 @@ async def process_video(
         
         # Save uploaded video
         input_path = TEMP_DIR / "uploads" / f"{job_id}_input.mp4"
-        with open(input_path, "wb") as f:
-            content = await video.read()
-            f.write(content)
+        size = await save_upload(video, input_path, UPLOAD_CHUNK_SIZE)
         
-        file_size_mb = len(content) / (1024 * 1024)
+        file_size_mb = size / (1024 * 1024)
         logger.info(f"✅ Video saved: {input_path} ({file_size_mb:.2f} MB)")
         
-        # Update status
-        job_status[job_id].status = "processing"
-        job_status[job_id].progress = 10
-        job_status[job_id].current_step = "Initializing processor..."
+        # Release the spooled upload (a full copy on disk or in memory) now,
+        # rather than when the request finishes after the whole pipeline
+        await video.close()
         
-        # Initialize processor with options
-        output_path = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
-        options = ProcessingOptions(
-            subtitle_style=script.style,
-            color_grading=script.color_grading,
-            enable_zoom=script.enable_zoom,
-            enable_transitions=script.enable_transitions
+        # Update status
+        status = _update_status(
+            status,
+            status="processing",
+            progress=10,
+            current_step="Initializing processor..."
         )
-        processor = VideoProcessor(str(input_path), str(output_path), options)
         
-        current_video = str(input_path)
-        total_steps = 5
-        current_step_num = 0
-        
-        # Step 1: Apply jump cuts with smooth transitions
-        if script.jumpCuts and len(script.jumpCuts) > 0:
-            current_step_num += 1
-            job_status[job_id].current_step = f"Applying {len(script.jumpCuts)} jump cuts..."
-            job_status[job_id].progress = int((current_step_num / total_steps) * 100)
-            logger.info(f"✂️  Step {current_step_num}/{total_steps}: Applying jump cuts")
-            
-            current_video = processor.apply_jump_cuts(script.jumpCuts)
-            logger.info(f"✅ Jump cuts applied")
-        
-        # Step 2: Add zoom effects on highlights
-        if script.enable_zoom and script.highlights and len(script.highlights) > 0:
-            current_step_num += 1
-            job_status[job_id].current_step = f"Adding zoom effects at {len(script.highlights)} moments..."
-            job_status[job_id].progress = int((current_step_num / total_steps) * 100)
-            logger.info(f"🔍 Step {current_step_num}/{total_steps}: Adding zoom effects")
-            
-            current_video = processor.add_zoom_effects(current_video, script.highlights)
-            logger.info(f"✅ Zoom effects added")
-        
-        # Step 3: Apply color grading
-        current_step_num += 1
-        job_status[job_id].current_step = f"Applying {script.color_grading} color grading..."
-        job_status[job_id].progress = int((current_step_num / total_steps) * 100)
-        logger.info(f"🎨 Step {current_step_num}/{total_steps}: Color grading")
-        
-        current_video = processor.add_color_grading(current_video, script.color_grading)
-        logger.info(f"✅ Color grading applied")
-        
-        # Step 4: Add professional subtitles
-        if script.subtitles and len(script.subtitles) > 0:
-            current_step_num += 1
-            job_status[job_id].current_step = f"Adding {len(script.subtitles)} subtitles ({script.style} style)..."
-            job_status[job_id].progress = int((current_step_num / total_steps) * 100)
-            logger.info(f"💬 Step {current_step_num}/{total_steps}: Adding subtitles")
-            
-            current_video = processor.add_subtitles(script.subtitles, current_video, keywords=script.keywords)
-            logger.info(f"✅ Subtitles added")
-        
-        # Step 5: Convert to 9:16 with blurred background
-        current_step_num += 1
-        job_status[job_id].current_step = "Converting to 9:16 format..."
-        job_status[job_id].progress = int((current_step_num / total_steps) * 100)
-        logger.info(f"📐 Step {current_step_num}/{total_steps}: Converting aspect ratio")
-        
-        final_path = processor.convert_aspect_ratio(current_video)
-        logger.info(f"✅ Video processed successfully: {final_path}")
-        
-        # Update final status
-        job_status[job_id].status = "completed"
-        job_status[job_id].progress = 100
-        job_status[job_id].current_step = "Processing complete!"
-        job_status[job_id].message = f"Video processed successfully in {total_steps} steps"
+        # Run the editing steps off the event loop so other requests keep flowing
+        loop = asyncio.get_running_loop()
+        final_path, total_steps = await loop.run_in_executor(
+            pipeline_executor, _run_pipeline, script, status, input_path
+        )
         
-        # Schedule cleanup of temporary files
-        background_tasks.add_task(cleanup_temp_files, job_id, keep_output=True)
         
         # Return processed video
+        # Stat once here; FileResponse builds the headers from it, and
+        # servers with the pathsend extension stream the file zero-copy
         return FileResponse(
             final_path,
+            stat_result=os.stat(final_path),
             media_type="video/mp4",
             filename=f"{job_id}_output.mp4",
+            # Delete the job's files (output included) once it has been sent
+            background=BackgroundTask(cleanup_temp_files, job_id),
             headers={
-                "Content-Disposition": f"attachment; filename={job_id}_output.mp4",
                 "X-Job-ID": job_id,
                 "X-Processing-Steps": str(total_steps)
             }
@@ -272,10 +383,14 @@ async def process_video(
     except Exception as e:
         logger.error(f"❌ Processing error for job {job_id}: {e}", exc_info=True)
         
-        if job_id:
-            job_status[job_id].status = "failed"
-            job_status[job_id].current_step = "Processing failed"
-            job_status[job_id].error = str(e)
+        if status:
+            # Start from the latest published progress, not this handler's copy
+            _update_status(
+                job_status.get(job_id, status),
+                status="failed",
+                current_step="Processing failed",
+                error=str(e)
+            )
         
         raise HTTPException(
             status_code=500,
@@ -286,24 +401,28 @@ async def process_video(
             }
         )
 
-@app.get("/status/{job_id}", response_model=ProcessingStatus)
+@app.get("/status/{job_id}", responses={200: {"model": ProcessingStatus}})
 def get_job_status(job_id: str):
     """Get processing status for a job"""
-    if job_id not in job_status:
+    status = job_status.get(job_id)
+    if status is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return job_status[job_id]
+    # Stored statuses are already validated, serialize directly
+    return Response(status.model_dump_json(), media_type="application/json")
 
 @app.post("/test")
 async def test_upload(video: UploadFile = File(...)):
     """Simple test endpoint to verify file upload works"""
     try:
-        content = await video.read()
+        size = 0
+        while chunk := await video.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
         return {
             "filename": video.filename,
             "content_type": video.content_type,
-            "size": len(content),
-            "size_mb": round(len(content) / (1024 * 1024), 2),
+            "size": size,
+            "size_mb": round(size / (1024 * 1024), 2),
             "status": "success"
         }
     except Exception as e:
@@ -313,40 +432,44 @@ async def test_upload(video: UploadFile = File(...)):
 def cleanup_job(job_id: str):
     """Manually cleanup job files"""
     try:
-        cleanup_temp_files(job_id, keep_output=False)
-        if job_id in job_status:
-            del job_status[job_id]
+        cleanup_temp_files(job_id)
+        job_status.pop(job_id)
         return {"message": f"Job {job_id} cleaned up successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def cleanup_temp_files(job_id: str, keep_output: bool = True):
+def cleanup_temp_files(job_id: str):
     """
     Cleanup temporary files for a job
     
     Args:
         job_id: Job ID
-        keep_output: Whether to keep the output file
     """
     try:
         # Remove input file
+        # (files already gone, e.g. cleaned up by a concurrent call, are skipped
+        # rather than aborting the rest)
         input_file = TEMP_DIR / "uploads" / f"{job_id}_input.mp4"
-        if input_file.exists():
+        with suppress(FileNotFoundError):
             input_file.unlink()
             logger.info(f"🗑️  Cleaned up input file: {input_file}")
+        # ...and the probe results VideoProcessor saved next to it
+        probe_sidecar(input_file).unlink(missing_ok=True)
         
-        # Remove processing files
-        processing_dir = TEMP_DIR / "processing"
-        for file in processing_dir.glob(f"*{job_id}*"):
-            file.unlink()
-            logger.info(f"🗑️  Cleaned up processing file: {file}")
+        # Remove processing files (VideoProcessor prefixes them with the job id)
+        prefix = f"{job_id}_"
+        with os.scandir(TEMP_DIR / "processing") as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.is_file():
+                    with suppress(FileNotFoundError):
+                        os.unlink(entry.path)
+                        logger.info(f"🗑️  Cleaned up processing file: {entry.path}")
         
-        # Optionally remove output file
-        if not keep_output:
-            output_file = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
-            if output_file.exists():
-                output_file.unlink()
-                logger.info(f"🗑️  Cleaned up output file: {output_file}")
+        # Remove output file
+        output_file = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
+        with suppress(FileNotFoundError):
+            output_file.unlink()
+            logger.info(f"🗑️  Cleaned up output file: {output_file}")
     except Exception as e:
         logger.error(f"Error cleaning up job {job_id}: {e}")
 
@@ -355,6 +478,10 @@ async def startup_event():
     """Run on application startup"""
     logger.info("🚀 AutoCut Python Worker starting...")
     logger.info(f"📁 Temp directory: {TEMP_DIR}")
+    ffmpeg_status, ffmpeg_version = get_ffmpeg_version()
+    logger.info(f"🎬 FFmpeg {ffmpeg_status}: {ffmpeg_version}")
+    # Probe the hardware encoder now rather than in the first job
+    detect_hardware_accel()
     logger.info(f"🌐 Server ready on http://0.0.0.0:8000")
     logger.info(f"📖 API docs: http://localhost:8000/docs")
 
@@ -362,18 +489,24 @@ async def startup_event():
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info("👋 AutoCut Python Worker shutting down...")
+    pipeline_executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
     
     print("  - Blurred background for better framing")
     print("  - 9:16 aspect ratio for TikTok/Reels")
     print("\nReady to process videos!\n")
     
+    # uvloop/httptools come with uvicorn[standard] (uvloop is not available on Windows).
+    # Single worker: job status and the pipeline executor live in this process.
     uvicorn.run(
         app,
         host="0.0.0.0",
         port=8000,
         log_level="info",
-        access_log=True
+        access_log=False,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11"
     )
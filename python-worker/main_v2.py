@@ -2,19 +2,24 @@
 # Clean architecture with AI-controlled processing
 # Now with performance monitoring and optimization
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict
-import json
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ValidationError
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import logging
+import os
 from pathlib import Path
 from datetime import datetime
 
 from ai_models import AIEditingScript
-from pipeline import ProcessingPipeline
-from performance_utils import memory_monitor, check_disk_space, temp_file_cleanup
+from pipeline import run_pipeline
+from job_store import SqliteJobStatusStore
+from ffmpeg_utils import probe_sidecar
+from performance_utils import check_disk_space, temp_file_cleanup, get_ffmpeg_version, detect_hardware_accel, save_upload
 
 # Setup logging
 logging.basicConfig(
@@ -46,6 +51,9 @@ TEMP_DIR.mkdir(exist_ok=True)
 (TEMP_DIR / "uploads").mkdir(exist_ok=True)
 (TEMP_DIR / "outputs").mkdir(exist_ok=True)
 
+# Uploads still in memory are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Job status tracking
 class ProcessingStatus(BaseModel):
     job_id: str
@@ -55,7 +63,50 @@ class ProcessingStatus(BaseModel):
     message: Optional[str] = None
     error: Optional[str] = None
 
-job_status: Dict[str, ProcessingStatus] = {}
+# Job statuses live in SQLite (WAL) so every server process sees every job;
+# finished jobs are forgotten after a day. The database (AUTOCUT_JOB_STATUS_DB
+# overrides its path) is opened on first use, not at import
+JOB_STATUS_DB = Path(os.environ.get("AUTOCUT_JOB_STATUS_DB", TEMP_DIR / "status.db"))
+job_status: SqliteJobStatusStore[ProcessingStatus] = SqliteJobStatusStore(
+    JOB_STATUS_DB, ProcessingStatus, ttl=86400
+)
+JOB_STATUS_PURGE_INTERVAL = 3600
+
+def _update_status(current: ProcessingStatus, /, **changes) -> ProcessingStatus:
+    """Publish a job's status changes as one new snapshot (a single row write)"""
+    status = current.model_copy(update=changes)
+    job_status[status.job_id] = status
+    return status
+
+async def purge_job_statuses():
+    """Periodically delete expired job statuses"""
+    while True:
+        await asyncio.sleep(JOB_STATUS_PURGE_INTERVAL)
+        try:
+            job_status.purge_expired()
+        except Exception as e:
+            logger.error(f"Job status purge failed: {e}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Start the pipeline worker processes"""
+    # Half the cores go to pipelines, shared between the server's worker processes
+    web_workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    workers = max(1, (os.cpu_count() or 2) // 2 // web_workers)
+    app.state.executor = ProcessPoolExecutor(max_workers=workers)
+    logger.info(f"Pipeline executor started with {workers} worker processes")
+    
+    # Probe once; hardware doesn't change while the server runs
+    app.state.hwaccel = detect_hardware_accel()
+    
+    app.state.purge_task = asyncio.create_task(purge_job_statuses())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the pipeline worker processes"""
+    app.state.executor.shutdown(wait=False, cancel_futures=True)
+    app.state.purge_task.cancel()
+    job_status.close()
 
 @app.get("/")
 def read_root():
@@ -78,21 +129,7 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Detailed health check"""
-    import subprocess
-    
-    try:
-        result = subprocess.run(
-            ["ffmpeg", "-version"],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=5
-        )
-        ffmpeg_status = "installed"
-        ffmpeg_version = result.stdout.split('\n')[0]
-    except Exception as e:
-        ffmpeg_status = "not found"
-        ffmpeg_version = str(e)
+    ffmpeg_status, ffmpeg_version = get_ffmpeg_version()
     
     return {
         "status": "healthy",
@@ -106,7 +143,6 @@ def health_check():
 
 @app.post("/process", response_class=FileResponse)
 async def process_video(
-    background_tasks: BackgroundTasks,
     video: UploadFile = File(...),
     editing_script: str = Form(...)
 ):
@@ -116,16 +152,21 @@ async def process_video(
     The editing_script should be a JSON string containing AIEditingScript
     """
     job_id = None
+    status = None
     
     try:
-        # Parse AI editing script
+        # Parse and validate AI editing script in a single pass
         try:
-            script_data = json.loads(editing_script)
-            script = AIEditingScript(**script_data)
-        except json.JSONDecodeError as e:
+            script = AIEditingScript.model_validate_json(editing_script)
+        except ValidationError as e:
+            if any(err['type'] == 'json_invalid' for err in e.errors()):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid JSON: {str(e)}"
+                )
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid JSON: {str(e)}"
+                detail=f"Invalid editing script: {str(e)}"
             )
         except Exception as e:
             raise HTTPException(
@@ -137,13 +178,14 @@ async def process_video(
         logger.info(f"Starting job: {job_id}")
         logger.info(f"Content: {script.metadata.contentType}, Mood: {script.metadata.mood}")
         
-        # Initialize job status
-        job_status[job_id] = ProcessingStatus(
+        # Initialize job status (trusted literals, no validation needed)
+        status = ProcessingStatus.model_construct(
             job_id=job_id,
             status="uploading",
             progress=0,
             current_step="Uploading video..."
         )
+        job_status[job_id] = status
         
         # Validate video
         if not video.content_type or not video.content_type.startswith('video/'):
@@ -161,47 +203,60 @@ async def process_video(
         
         # Save uploaded video
         input_path = TEMP_DIR / "uploads" / f"{job_id}_input.mp4"
-        with open(input_path, "wb") as f:
-            content = await video.read()
-            f.write(content)
+        size = await save_upload(video, input_path, UPLOAD_CHUNK_SIZE)
         
-        file_size_mb = len(content) / (1024 * 1024)
+        file_size_mb = size / (1024 * 1024)
         logger.info(f"Video saved: {input_path} ({file_size_mb:.2f} MB)")
         
+        # Release the spooled upload (a full copy on disk or in memory) now,
+        # rather than when the request finishes after the whole pipeline
+        await video.close()
+        
         # Update status
-        job_status[job_id].status = "processing"
-        job_status[job_id].progress = 10
-        job_status[job_id].current_step = "Initializing AI pipeline..."
+        status = _update_status(
+            status,
+            status="processing",
+            progress=10,
+            current_step="Initializing AI pipeline..."
+        )
         
-        # Process with memory monitoring and cleanup
-        with memory_monitor(job_id):
-            with temp_file_cleanup(input_path):
-                # Initialize pipeline
-                output_path = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
-                pipeline = ProcessingPipeline(input_path, output_path, script)
-                
-                # Execute AI-driven processing
-                job_status[job_id].progress = 20
-                job_status[job_id].current_step = "Processing with AI instructions..."
-                
-                final_path = pipeline.execute()
+        # Process with cleanup (memory is monitored in the worker, by run_pipeline)
+        with temp_file_cleanup(input_path, probe_sidecar(input_path)):
+            output_path = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
+            
+            # Execute AI-driven processing in a worker process so the
+            # event loop keeps serving uploads and status polls
+            status = _update_status(
+                status,
+                progress=20,
+                current_step="Processing with AI instructions..."
+            )
+            
+            loop = asyncio.get_running_loop()
+            final_path = await loop.run_in_executor(
+                app.state.executor, run_pipeline,
+                input_path, output_path, script.model_dump_json(), app.state.hwaccel
+            )
         
         # Update final status
-        job_status[job_id].status = "completed"
-        job_status[job_id].progress = 100
-        job_status[job_id].current_step = "Complete!"
-        job_status[job_id].message = "AI-driven processing complete"
+        status = _update_status(
+            status,
+            status="completed",
+            progress=100,
+            current_step="Complete!",
+            message="AI-driven processing complete"
+        )
         
-        # Schedule cleanup (but keep output)
-        background_tasks.add_task(cleanup_temp_files, job_id, keep_output=True)
         
         # Return processed video
         return FileResponse(
             final_path,
+            stat_result=os.stat(final_path),
             media_type="video/mp4",
             filename=f"{job_id}_output.mp4",
+            # Delete the job's files (output included) once it has been sent
+            background=BackgroundTask(cleanup_temp_files, job_id),
             headers={
-                "Content-Disposition": f"attachment; filename={job_id}_output.mp4",
                 "X-Job-ID": job_id
             }
         )
@@ -211,10 +266,13 @@ async def process_video(
     except Exception as e:
         logger.error(f"Processing error for job {job_id}: {e}", exc_info=True)
         
-        if job_id:
-            job_status[job_id].status = "failed"
-            job_status[job_id].current_step = "Failed"
-            job_status[job_id].error = str(e)
+        if status:
+            _update_status(
+                status,
+                status="failed",
+                current_step="Failed",
+                error=str(e)
+            )
         
         raise HTTPException(
             status_code=500,
@@ -225,38 +283,33 @@ async def process_video(
             }
         )
 
-@app.get("/status/{job_id}", response_model=ProcessingStatus)
+@app.get("/status/{job_id}", responses={200: {"model": ProcessingStatus}})
 def get_job_status(job_id: str):
     """Get processing status"""
-    if job_id not in job_status:
+    status_json = job_status.get_json(job_id)
+    if status_json is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job_status[job_id]
+    
+    # Stored as the model's JSON already, return it as-is
+    return Response(status_json, media_type="application/json")
 
-def cleanup_temp_files(job_id: str, keep_output: bool = True):
-    """Cleanup temporary files"""
+def cleanup_temp_files(job_id: str):
+    """Cleanup temporary files (the per-job processing dir is removed by run_pipeline)"""
     try:
         # Remove input
         input_file = TEMP_DIR / "uploads" / f"{job_id}_input.mp4"
-        if input_file.exists():
-            input_file.unlink()
-        
-        # Remove processing files
-        processing_dir = TEMP_DIR / "processing"
-        if processing_dir.exists():
-            import shutil
-            shutil.rmtree(processing_dir)
+        input_file.unlink(missing_ok=True)
         
-        # Optionally remove output
-        if not keep_output:
-            output_file = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
-            if output_file.exists():
-                output_file.unlink()
+        # Remove output
+        output_file = TEMP_DIR / "outputs" / f"{job_id}_output.mp4"
+        output_file.unlink(missing_ok=True)
                 
         logger.info(f"Cleaned up files for job: {job_id}")
     except Exception as e:
         logger.error(f"Cleanup error: {e}")
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
     
     print("=" * 70)
@@ -275,9 +328,17 @@ if __name__ == "__main__":
     print("  - Keyword-highlighted subtitles")
     print("\nReady to process videos!\n")
     
+    # Job statuses are shared through SQLite, so several server processes
+    # can serve /status; exported so each one sizes its pipeline pool
+    workers = int(os.environ.get("WEB_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2)))
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    
     uvicorn.run(
-        app,
+        "main_v2:app",
         host="0.0.0.0",
         port=8000,
-        log_level="info"
+        log_level="info",
+        workers=workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11"
     )
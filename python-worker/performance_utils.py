@@ -1,16 +1,36 @@
 # Performance Utilities - Memory monitoring and optimization
 
 import psutil
+import asyncio
 import logging
+import functools
 import gc
+import os
+import sys
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, Generator, Tuple
 import shutil
 
+from ffmpeg_utils import VAAPI_DEVICE, h264_encoder_works
+
 logger = logging.getLogger(__name__)
 
 
+# Jobs that grew RSS by more than this get a full collection afterwards;
+# everything else only collects the young generation
+GC_FULL_THRESHOLD_MB = 200
+
+# Set DEBUG_MEM=1 to log the top allocation sites per job (tracemalloc)
+DEBUG_MEM = os.environ.get("DEBUG_MEM") == "1"
+
+
+@functools.lru_cache(maxsize=None)
+def _process(pid: int) -> psutil.Process:
+    """psutil handle for this process (keyed by pid so forked workers get their own)"""
+    return psutil.Process(pid)
+
+
 @contextmanager
 def memory_monitor(job_id: str) -> Generator[None, None, None]:
     """
@@ -21,11 +41,17 @@ def memory_monitor(job_id: str) -> Generator[None, None, None]:
             # process video
             pass
     """
-    process = psutil.Process()
+    process = _process(os.getpid())
     start_mem = process.memory_info().rss / 1024 / 1024  # MB
     
     logger.info(f"💾 Memory at start: {start_mem:.1f}MB")
     
+    if DEBUG_MEM:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        start_snapshot = tracemalloc.take_snapshot()
+    
     try:
         yield
     finally:
@@ -34,14 +60,21 @@ def memory_monitor(job_id: str) -> Generator[None, None, None]:
         
         logger.info(f"💾 Memory at end: {end_mem:.1f}MB (Δ{delta:+.1f}MB)")
         
-        # Force garbage collection
-        gc.collect()
-        
-        after_gc = process.memory_info().rss / 1024 / 1024
-        gc_freed = end_mem - after_gc
+        if DEBUG_MEM:
+            for stat in tracemalloc.take_snapshot().compare_to(start_snapshot, 'lineno')[:5]:
+                logger.info(f"🔍 {stat}")
         
-        if gc_freed > 0:
-            logger.info(f"♻️  GC freed: {gc_freed:.1f}MB")
+        if delta > GC_FULL_THRESHOLD_MB:
+            # Big job: worth a full (gen 2) collection
+            gc.collect()
+            
+            after_gc = process.memory_info().rss / 1024 / 1024
+            gc_freed = end_mem - after_gc
+            
+            if gc_freed > 0:
+                logger.info(f"♻️  GC freed: {gc_freed:.1f}MB")
+        else:
+            gc.collect(0)
 
 
 def get_disk_space(path: Path) -> dict:
@@ -93,52 +126,156 @@ def temp_file_cleanup(*paths: Path) -> Generator[None, None, None]:
                 logger.warning(f"Failed to cleanup {path}: {e}")
 
 
+def drop_page_cache(path: Path) -> None:
+    """
+    Tell the kernel a file's cached pages won't be read again
+    
+    Used on pipeline intermediates once the next step has consumed them,
+    so they don't crowd the next step's working set out of the page cache.
+    No-op where posix_fadvise isn't available (Windows, macOS).
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError as e:
+        logger.debug(f"posix_fadvise failed for {path}: {e}")
+    finally:
+        os.close(fd)
+
+
+def _sendfile_all(src_fd: int, dst_fd: int, size: int) -> None:
+    """os.sendfile until `size` bytes from offset 0 have been written"""
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+        if sent == 0:
+            raise OSError(f"sendfile stopped at {offset}/{size} bytes")
+        offset += sent
+
+
+async def save_upload(upload: Any, path: Path, chunk_size: int = 1024 * 1024) -> int:
+    """
+    Save a Starlette/FastAPI UploadFile to `path`, returning its size in bytes
+    
+    Uploads Starlette has already spooled to a temp file on disk are
+    copied kernel-side with os.sendfile (in a worker thread), so the
+    bytes never pass through Python. Small in-memory uploads, and
+    platforms where sendfile can't target a file, use chunked reads.
+    """
+    src = upload.file
+    if hasattr(os, 'sendfile') and getattr(src, '_rolled', True):
+        try:
+            src_fd = src.fileno()
+            size = os.fstat(src_fd).st_size
+            with open(path, "wb") as dst:
+                await asyncio.to_thread(_sendfile_all, src_fd, dst.fileno(), size)
+            return size
+        except (OSError, ValueError) as e:
+            logger.debug(f"sendfile upload copy unavailable, reading in chunks: {e}")
+            await upload.seek(0)
+    
+    size = 0
+    with open(path, "wb") as f:
+        while chunk := await upload.read(chunk_size):
+            size += len(chunk)
+            f.write(chunk)
+    return size
+
+
+# FICLONE ioctl request (fcntl.FICLONE only exists on Python 3.12+)
+_FICLONE = 0x40049409
+
+
+def _clone_file(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone (reflink) of src to dst; False if not supported here"""
+    if sys.platform == 'linux':
+        import fcntl
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), getattr(fcntl, 'FICLONE', _FICLONE), fsrc.fileno())
+            return True
+        except OSError:
+            return False
+    
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    
+    return False
+
+
+def _copy_file_range(src: Path, dst: Path) -> bool:
+    """Kernel-side copy with os.copy_file_range; False if not supported for these files"""
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            copied = 0
+            while copied < size:
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                if n == 0:
+                    return False
+                copied += n
+        return True
+    except OSError:
+        return False
+
+
+def copy_file(src: Path, dst: Path) -> None:
+    """
+    Copy a file with its metadata, like shutil.copy2
+    
+    On filesystems with reflinks (Btrfs, XFS, APFS) the copy is an O(1)
+    copy-on-write clone. Otherwise Linux copies kernel-side with
+    copy_file_range (server-side on NFS/SMB), and anything else falls
+    back to shutil.copy2.
+    """
+    if _clone_file(src, dst):
+        shutil.copystat(src, dst)
+        logger.debug(f"Cloned {src} -> {dst}")
+    elif _copy_file_range(src, dst):
+        shutil.copystat(src, dst)
+        logger.debug(f"Copied {src} -> {dst} with copy_file_range")
+    else:
+        shutil.copy2(src, dst)
+
+
+@functools.lru_cache(maxsize=1)
 def detect_hardware_accel() -> str | None:
     """
     Detect available hardware acceleration
     
+    Hardware doesn't change while the worker runs, so the probe is
+    done once per process and cached.
+    
     Returns:
-        'cuda' | 'qsv' | 'videotoolbox' | None
+        'cuda' | 'qsv' | 'amf' | 'vaapi' | 'videotoolbox' | None
     """
-    import subprocess
     import platform
     
     try:
-        # Check NVIDIA GPU (CUDA)
-        if platform.system() == "Windows" or platform.system() == "Linux":
-            try:
-                result = subprocess.run(
-                    ['nvidia-smi'],
-                    capture_output=True,
-                    text=True,
-                    timeout=2
-                )
-                if result.returncode == 0:
-                    logger.info("🎮 CUDA acceleration available")
-                    return 'cuda'
-            except:
-                pass
-        
-        # Check Intel QuickSync (QSV)
-        if platform.system() == "Windows":
-            # Check for Intel GPU
-            try:
-                result = subprocess.run(
-                    ['wmic', 'path', 'win32_VideoController', 'get', 'name'],
-                    capture_output=True,
-                    text=True,
-                    timeout=2
-                )
-                if 'Intel' in result.stdout:
-                    logger.info("⚡ Intel QSV acceleration available")
-                    return 'qsv'
-            except:
-                pass
-        
-        # Check Apple VideoToolbox (macOS)
+        # Candidates in order of preference; a GPU being present doesn't mean
+        # this FFmpeg build (or its driver) can encode on it, so each one
+        # must pass a short trial encode
         if platform.system() == "Darwin":
-            logger.info("🍎 VideoToolbox acceleration available")
-            return 'videotoolbox'
+            candidates = ['videotoolbox']
+        else:
+            candidates = ['cuda', 'qsv', 'amf']
+            if platform.system() == "Linux" and os.path.exists(VAAPI_DEVICE):
+                candidates.append('vaapi')
+        
+        for hwaccel in candidates:
+            if h264_encoder_works(hwaccel):
+                logger.info(f"🎮 {hwaccel} hardware encoding available")
+                return hwaccel
         
     except Exception as e:
         logger.debug(f"Hardware detection failed: {e}")
@@ -147,6 +284,42 @@ def detect_hardware_accel() -> str | None:
     return None
 
 
+_ffmpeg_version: Tuple[str, str] | None = None
+
+
+def get_ffmpeg_version() -> Tuple[str, str]:
+    """
+    Get FFmpeg install status and version line
+    
+    A successful probe is cached for the life of the process so health
+    checks don't fork `ffmpeg -version` on every poll; failures are
+    retried on the next call.
+    
+    Returns:
+        (status, version) where status is 'installed' | 'timeout' | 'not found'
+    """
+    global _ffmpeg_version
+    if _ffmpeg_version is not None:
+        return _ffmpeg_version
+    
+    import subprocess
+    
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-version"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5
+        )
+    except subprocess.TimeoutExpired:
+        return "timeout", "FFmpeg check timed out"
+    except Exception as e:
+        return "not found", str(e)
+    
+    _ffmpeg_version = ("installed", result.stdout.split('\n')[0])
+    return _ffmpeg_version
+
 class ProgressTracker:
     """Track and report pipeline progress"""
     
@@ -2,25 +2,61 @@
 
 import ffmpeg
 import logging
+import os
+import shutil
 from pathlib import Path
-from ai_models import AIEditingScript
+from typing import List, Optional
+from ai_models import AIEditingScript, Highlight, JumpCut
 from processor_audio import AudioProcessor
 from processor_video import VideoProcessor
 from processor_effects import EffectsProcessor
 from processor_subtitles import SubtitleProcessor
-from timeline_manager import TimelineManager, adjust_subtitle_timestamps
+from performance_utils import copy_file, drop_page_cache, memory_monitor
+from ffmpeg_utils import prepare_for_encoder, probe_video, run_encode, run_ffmpeg, video_decoder_options, video_encoder_options
+from timeline_manager import TimelineManager, adjust_segment_timestamps
 
 logger = logging.getLogger(__name__)
 
+# Where job intermediates go; defaults to RAM-backed /dev/shm when it has room
+TEMP_ROOT_ENV = "AUTOCUT_TEMP_DIR"
+DEFAULT_TEMP_ROOT = "/dev/shm"
+
+# Free space the temp root needs, as a multiple of the input size
+TEMP_SPACE_FACTOR = 3
+
+# Kept segments shorter than this (seconds) between cuts are cut as well
+MIN_SEGMENT_DURATION = 0.25
+
+def select_temp_root(input_path: Path) -> Path:
+    """Temp root for a job: AUTOCUT_TEMP_DIR (or /dev/shm) if it fits, else next to the uploads"""
+    fallback = input_path.parent.parent
+    base = Path(os.environ.get(TEMP_ROOT_ENV, DEFAULT_TEMP_ROOT))
+    try:
+        if shutil.disk_usage(base).free >= TEMP_SPACE_FACTOR * input_path.stat().st_size:
+            return base
+    except OSError:
+        pass
+    
+    logger.info(f"Not enough room in {base} for intermediates, using {fallback}")
+    return fallback
+
 class ProcessingPipeline:
     """Orchestrate AI-driven video processing"""
     
-    def __init__(self, input_path: Path, output_path: Path, script: AIEditingScript):
+    def __init__(
+        self,
+        input_path: Path,
+        output_path: Path,
+        script: AIEditingScript,
+        hwaccel: Optional[str] = None
+    ):
         self.input_path = input_path
         self.output_path = output_path
         self.script = script
-        self.temp_dir = input_path.parent.parent / "processing"
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.hwaccel = hwaccel
+        # Per-job directory, created by the processors; the single-pass
+        # render only puts the ASS file there
+        self.temp_dir = select_temp_root(input_path) / "processing" / script.job_id
         
         # Get video info
         self.video_info = self._get_video_info()
@@ -30,139 +66,41 @@ class ProcessingPipeline:
         
         # Initialize processors
         self.audio_processor = AudioProcessor(script.audio, self.temp_dir)
-        self.video_processor = VideoProcessor(script.visual, self.temp_dir, self.video_info)
-        self.effects_processor = EffectsProcessor(script, self.temp_dir, self.video_info)
-        self.subtitle_processor = SubtitleProcessor(script.subtitles, self.temp_dir, self.video_info)
+        self.video_processor = VideoProcessor(script.visual, self.temp_dir, self.video_info, hwaccel)
+        self.effects_processor = EffectsProcessor(script, self.temp_dir, self.video_info, hwaccel)
+        self.subtitle_processor = SubtitleProcessor(script.subtitles, self.temp_dir, self.video_info, hwaccel)
         
         logger.info(f"Pipeline initialized for job: {script.job_id}")
         logger.info(f"Content type: {script.metadata.contentType}, Mood: {script.metadata.mood}")
         logger.info(f"Original video duration: {self.video_info['duration']:.2f}s")
+        logger.info(f"Hardware acceleration: {hwaccel or 'none'}")
     
     def execute(self) -> Path:
         """Execute full AI-driven processing pipeline"""
-        current_video = self.input_path
-        
         logger.info("=" * 60)
         logger.info("🎬 Starting AI-Driven Video Processing")
         logger.info("=" * 60)
         
         try:
-            # Step 1: Audio Normalization (FIRST - ensures consistent audio)
-            logger.info("\n[Step 1/9] Audio Normalization")
-            current_video = self.audio_processor.normalize(current_video)
+            # Cuts change the timeline, so everything timed after them
+            # (subtitles, highlights) is remapped up front for both render paths
+            self._prepare_timeline()
+            highlights = self._edited_highlights()
             
-            # Step 2: Dynamic Audio Adjustments
-            if self.script.audio.segments:
-                logger.info(f"\n[Step 2/9] Dynamic Audio Adjustments ({len(self.script.audio.segments)} segments)")
-                current_video = self.audio_processor.apply_dynamic_adjustments(
-                    current_video,
-                    self.script.audio.segments
-                )
-            else:
-                logger.info("\n[Step 2/9] Dynamic Audio Adjustments (skipped)")
-            
-            # Step 3: Jump Cuts (remove unwanted segments)
-            if self.script.timeline.cuts:
-                logger.info(f"\n[Step 3/9] Jump Cuts ({len(self.script.timeline.cuts)} cuts)")
-                
-                # Register cuts with timeline manager BEFORE applying them
-                for cut in self.script.timeline.cuts:
-                    try:
-                        self.timeline.add_cut(cut.start, cut.end)
-                        logger.debug(f"Registered cut: {cut.start:.2f}s - {cut.end:.2f}s ({cut.reason})")
-                    except ValueError as e:
-                        logger.warning(f"Invalid cut skipped: {e}")
-                
-                # Log timeline summary
-                summary = self.timeline.get_summary()
-                logger.info(f"Timeline: {summary['original_duration']:.2f}s → {summary['edited_duration']:.2f}s")
-                logger.info(f"Total removed: {summary['total_removed']:.2f}s, Kept segments: {summary['kept_segments']}")
-                
-                # Apply cuts to video
-                current_video = self.video_processor.apply_jump_cuts(
-                    current_video,
-                    self.script.timeline.cuts
-                )
-                
-                # Adjust subtitle timestamps using TimelineManager
-                if self.script.subtitles.segments:
-                    logger.info("Adjusting subtitle timestamps after jump cuts...")
-                    original_count = len(self.script.subtitles.segments)
-                    
-                    # Convert subtitle segments to dict format
-                    subtitle_dicts = [
-                        {
-                            'start': seg.start,
-                            'end': seg.end,
-                            'text': seg.text
-                        }
-                        for seg in self.script.subtitles.segments
-                    ]
-                    
-                    # Adjust using timeline manager
-                    adjusted_dicts = adjust_subtitle_timestamps(subtitle_dicts, self.timeline)
-                    
-                    # Update script with adjusted subtitles (clamp to valid range)
-                    from ai_models import SubtitleSegment
-                    self.script.subtitles.segments = [
-                        SubtitleSegment(
-                            start=max(0.0, sub['start']),  # Clamp to >= 0
-                            end=max(0.01, sub['end']),     # Clamp to > 0
-                            text=sub['text']
-                        )
-                        for sub in adjusted_dicts
-                        if sub['end'] > 0  # Skip subtitles that are completely cut
-                    ]
-                    
-                    removed_count = original_count - len(self.script.subtitles.segments)
-                    logger.info(
-                        f"✅ Subtitle timestamps adjusted: {original_count} → {len(self.script.subtitles.segments)} "
-                        f"({removed_count} removed from cuts)"
-                    )
-            else:
-                logger.info("\n[Step 3/9] Jump Cuts (skipped)")
-            
-            # Step 4: Highlight Effects (zoom, blur, slow-motion)
-            if self.script.timeline.highlights:
-                logger.info(f"\n[Step 4/9] Highlight Effects ({len(self.script.timeline.highlights)} highlights)")
-                current_video = self.effects_processor.apply_highlights(
-                    current_video,
-                    self.script.timeline.highlights
-                )
-            else:
-                logger.info("\n[Step 4/9] Highlight Effects (skipped)")
-            
-            # Step 5: Transitions
-            if self.script.timeline.transitions:
-                logger.info(f"\n[Step 5/9] Transitions ({len(self.script.timeline.transitions)} transitions)")
-                current_video = self.effects_processor.apply_transitions(
-                    current_video,
-                    self.script.timeline.transitions
+            try:
+                current_video = self._execute_fused(highlights)
+                drop_page_cache(self.input_path)
+            except ffmpeg.Error as e:
+                logger.warning(
+                    f"⚠️  Single-pass render failed, falling back to step-by-step: "
+                    f"{e.stderr.decode(errors='replace') if e.stderr else e}"
                 )
-            else:
-                logger.info("\n[Step 5/9] Transitions (skipped)")
-            
-            # Step 6: Color Grading
-            logger.info(f"\n[Step 6/9] Color Grading ({self.script.visual.colorGrading.preset})")
-            current_video = self.video_processor.apply_color_grading(current_video)
-            
-            # Step 7: Aspect Ratio Conversion (BEFORE subtitles!)
-            logger.info(f"\n[Step 7/9] Aspect Ratio ({self.script.visual.aspectRatio.target}, {self.script.visual.aspectRatio.strategy})")
-            current_video = self.video_processor.convert_aspect_ratio(current_video)
-            
-            # Step 8: Subtitles (AFTER everything else to ensure perfect sync)
-            if self.script.subtitles.segments:
-                logger.info(f"\n[Step 8/9] Subtitles ({len(self.script.subtitles.segments)} segments)")
-                logger.info(f"Subtitle style: {self.script.subtitles.style.font}, pos: {self.script.subtitles.style.position}")
-                current_video = self.subtitle_processor.add_subtitles(current_video)
-            else:
-                logger.info("\n[Step 8/9] Subtitles (skipped)")
+                current_video = self._execute_staged(highlights)
             
-            # Step 9: Copy to final output
+            # Step 9: Move to final output
             logger.info("\n[Step 9/9] Finalizing")
             if current_video != self.output_path:
-                import shutil
-                shutil.copy2(current_video, self.output_path)
+                self._finalize(current_video)
                 logger.info(f"✅ Final video: {self.output_path}")
             
             logger.info("\n" + "=" * 60)
@@ -181,20 +119,242 @@ class ProcessingPipeline:
             
         except Exception as e:
             logger.error(f"❌ Pipeline execution failed: {e}", exc_info=True)
+            # Nothing half-written is left where a finished output would be
+            self.output_path.unlink(missing_ok=True)
             raise
     
-    def _get_video_info(self) -> dict:
-        """Get video metadata"""
+    def _prepare_timeline(self):
+        """Register jump cuts and move subtitles onto the edited timeline"""
+        if not self.script.timeline.cuts:
+            return
+        
+        # Register cuts with timeline manager BEFORE applying them
+        for cut in self.script.timeline.cuts:
+            try:
+                self.timeline.add_cut(cut.start, cut.end)
+                logger.debug(f"Registered cut: {cut.start:.2f}s - {cut.end:.2f}s ({cut.reason})")
+            except ValueError as e:
+                logger.warning(f"Invalid cut skipped: {e}")
+        
+        # A few frames left between two cuts would only flash on screen; cut
+        # them from the timeline and the video alike so subtitles stay in sync
+        slivers = self.timeline.drop_short_segments(MIN_SEGMENT_DURATION)
+        if slivers:
+            logger.info(f"Cutting {len(slivers)} segments shorter than {MIN_SEGMENT_DURATION}s: {slivers}")
+            self.script.timeline.cuts = self.script.timeline.cuts + [
+                JumpCut(start=start, end=end, reason="Too short to keep", type='pause')
+                for start, end in slivers
+            ]
+        
+        # Log timeline summary
+        summary = self.timeline.get_summary()
+        logger.info(f"Timeline: {summary['original_duration']:.2f}s → {summary['edited_duration']:.2f}s")
+        logger.info(f"Total removed: {summary['total_removed']:.2f}s, Kept segments: {summary['kept_segments']}")
+        
+        # Adjust subtitle timestamps using TimelineManager
+        if self.script.subtitles.segments:
+            logger.info("Adjusting subtitle timestamps after jump cuts...")
+            original_count = len(self.script.subtitles.segments)
+            
+            # Copy the surviving segments with their new times (no re-validation)
+            self.script.subtitles.segments = [
+                segment.model_copy(update={'start': start, 'end': end})
+                for segment, start, end in adjust_segment_timestamps(self.script.subtitles.segments, self.timeline)
+            ]
+            
+            removed_count = original_count - len(self.script.subtitles.segments)
+            logger.info(
+                f"✅ Subtitle timestamps adjusted: {original_count} → {len(self.script.subtitles.segments)} "
+                f"({removed_count} removed from cuts)"
+            )
+    
+    def _edited_highlights(self) -> List[Highlight]:
+        """Highlights with times mapped onto the edited timeline (fully cut ones dropped)"""
+        highlights = self.script.timeline.highlights
+        if not self.script.timeline.cuts:
+            return list(highlights)
+        
+        return [
+            highlight.model_copy(update={'start': start, 'end': end})
+            for highlight, start, end in adjust_segment_timestamps(highlights, self.timeline)
+        ]
+    
+    def _execute_fused(self, highlights: List[Highlight]) -> Path:
+        """Render every step in a single FFmpeg pass straight into the output file"""
+        output = self.output_path
+        
+        # One filter graph over the source streams; ffmpeg-python links the
+        # filters and escapes their options
+        source = ffmpeg.input(str(self.input_path), **video_decoder_options(self.hwaccel))
+        video = source.video
+        audio = source.audio if self.video_info['has_audio'] else None
+        
+        # Audio: normalize → adjustments (original times), before the cuts
+        if audio is not None:
+            audio = self.audio_processor.build_normalize(audio)
+            audio = self.audio_processor.build_adjustments(audio, self.script.audio.segments)
+        
+        # Video: cuts → highlights → color → aspect → subtitles (same order as the steps)
+        if self.script.timeline.cuts:
+            video, audio = self.video_processor.build_cuts(video, audio, self.script.timeline.cuts)
+        video = self.effects_processor.build_highlights(video, highlights)
+        video = self.video_processor.build_color(video)
+        video, _, _ = self.video_processor.build_aspect(video)
+        video = self.subtitle_processor.build_subtitles(video)
+        video = prepare_for_encoder(video, self.hwaccel)
+        
+        streams = [video] if audio is None else [video, audio]
+        
+        # Hardware decode/encode when available; the staged fallback retries
+        # its encodes on software, so a GPU/driver problem can't fail both paths
+        encoder_args = video_encoder_options(self.hwaccel)
+        
+        logger.info("\n[Steps 1-8/9] Single-pass render")
+        logger.info(f"Encoder: {encoder_args['vcodec']}")
         try:
-            probe = ffmpeg.probe(str(self.input_path))
-            video_stream = next(s for s in probe['streams'] if s['codec_type'] == 'video')
+            run_ffmpeg(
+                ffmpeg
+                .output(
+                    *streams,
+                    str(output),
+                    acodec='aac',
+                    # Final file: index up front so it plays while still downloading
+                    movflags='+faststart',
+                    loglevel='error',
+                    **encoder_args
+                )
+                .overwrite_output()
+            )
+        except BaseException:
+            # Don't leave a partial render in the outputs (or its space taken
+            # while the staged fallback runs)
+            output.unlink(missing_ok=True)
+            raise
+        logger.info("✅ Single-pass render complete")
+        return output
+    
+    def _execute_staged(self, highlights: List[Highlight]) -> Path:
+        """Render each step as its own FFmpeg pass (fallback path)"""
+        current_video = self.input_path
+        
+        # Step 1: Audio Normalization (FIRST - ensures consistent audio)
+        logger.info("\n[Step 1/9] Audio Normalization")
+        current_video = self._advance(current_video, self.audio_processor.normalize(current_video))
+        
+        # Step 2: Dynamic Audio Adjustments
+        if self.script.audio.segments:
+            logger.info(f"\n[Step 2/9] Dynamic Audio Adjustments ({len(self.script.audio.segments)} segments)")
+            current_video = self._advance(current_video, self.audio_processor.apply_dynamic_adjustments(
+                current_video,
+                self.script.audio.segments
+            ))
+        else:
+            logger.info("\n[Step 2/9] Dynamic Audio Adjustments (skipped)")
+        
+        # Step 3: Jump Cuts (remove unwanted segments)
+        if self.script.timeline.cuts:
+            logger.info(f"\n[Step 3/9] Jump Cuts ({len(self.script.timeline.cuts)} cuts)")
+            current_video = self._advance(current_video, self.video_processor.apply_jump_cuts(
+                current_video,
+                self.script.timeline.cuts
+            ))
+        else:
+            logger.info("\n[Step 3/9] Jump Cuts (skipped)")
+        
+        # Steps 4, 6 and 7 are all frame filters, so they share one encode
+        # (only without transitions, which would sit between them)
+        combined = None
+        if not self.script.timeline.transitions:
+            combined = self._render_frame_effects(current_video, highlights)
+        
+        if combined is not None:
+            current_video = self._advance(current_video, combined)
+        else:
+            # Step 4: Highlight Effects (zoom, blur, slow-motion)
+            if highlights:
+                logger.info(f"\n[Step 4/9] Highlight Effects ({len(highlights)} highlights)")
+                current_video = self._advance(current_video, self.effects_processor.apply_highlights(current_video, highlights))
+            else:
+                logger.info("\n[Step 4/9] Highlight Effects (skipped)")
             
-            info = {
-                'width': int(video_stream['width']),
-                'height': int(video_stream['height']),
-                'duration': float(video_stream.get('duration', probe['format']['duration']))
-            }
+            # Step 5: Transitions
+            if self.script.timeline.transitions:
+                logger.info(f"\n[Step 5/9] Transitions ({len(self.script.timeline.transitions)} transitions)")
+                current_video = self._advance(current_video, self.effects_processor.apply_transitions(
+                    current_video,
+                    self.script.timeline.transitions
+                ))
+            else:
+                logger.info("\n[Step 5/9] Transitions (skipped)")
+            
+            # Step 6: Color Grading
+            logger.info(f"\n[Step 6/9] Color Grading ({self.script.visual.colorGrading.preset})")
+            current_video = self._advance(current_video, self.video_processor.apply_color_grading(current_video))
             
+            # Step 7: Aspect Ratio Conversion (BEFORE subtitles!)
+            logger.info(f"\n[Step 7/9] Aspect Ratio ({self.script.visual.aspectRatio.target}, {self.script.visual.aspectRatio.strategy})")
+            current_video = self._advance(current_video, self.video_processor.convert_aspect_ratio(current_video))
+        
+        # Step 8: Subtitles (AFTER everything else to ensure perfect sync)
+        if self.script.subtitles.segments:
+            logger.info(f"\n[Step 8/9] Subtitles ({len(self.script.subtitles.segments)} segments)")
+            logger.info(f"Subtitle style: {self.script.subtitles.style.font}, pos: {self.script.subtitles.style.position}")
+            current_video = self._advance(current_video, self.subtitle_processor.add_subtitles(current_video))
+        else:
+            logger.info("\n[Step 8/9] Subtitles (skipped)")
+        
+        return current_video
+    
+    def _render_frame_effects(self, video_path: Path, highlights: List[Highlight]) -> Optional[Path]:
+        """Highlights → color grading → aspect ratio in one encode; None if that pass fails"""
+        output = self.temp_dir / "07_frame_effects.mp4"
+        
+        logger.info(f"\n[Steps 4-7/9] Highlights ({len(highlights)}), Color Grading, Aspect Ratio (one pass)")
+        source = ffmpeg.input(str(video_path))
+        source_video = source.video
+        video = self.effects_processor.build_highlights(source_video, highlights)
+        video = self.video_processor.build_color(video)
+        video, _, _ = self.video_processor.build_aspect(video)
+        
+        if video is source_video:
+            logger.info("Nothing to render, skipping")
+            return video_path
+        
+        try:
+            run_encode((video, source['a?']), str(output), self.hwaccel, acodec='copy')
+        except ffmpeg.Error as e:
+            logger.warning(
+                f"⚠️  Combined frame effects failed, applying them one by one: "
+                f"{e.stderr.decode(errors='replace') if e.stderr else e}"
+            )
+            return None
+        
+        logger.info("✅ Highlights, color grading and aspect ratio applied")
+        return output
+    
+    def _advance(self, previous: Path, current: Path) -> Path:
+        """Move to a step's output, dropping the consumed input from the page cache"""
+        if current != previous:
+            drop_page_cache(previous)
+        return current
+    
+    def _finalize(self, video_path: Path):
+        """Move the last intermediate into place (the untouched upload is copied)"""
+        if video_path == self.input_path:
+            copy_file(video_path, self.output_path)
+            return
+        try:
+            os.replace(video_path, self.output_path)
+        except OSError:
+            # Different filesystem (e.g. intermediates on /dev/shm): copy, then
+            # free the intermediate right away instead of at cleanup
+            copy_file(video_path, self.output_path)
+            video_path.unlink()
+    
+    def _get_video_info(self) -> dict:
+        """Get video metadata"""
+        try:
+            info = probe_video(self.input_path)
             logger.debug(f"Video info: {info['width']}x{info['height']}, {info['duration']:.2f}s")
             return info
             
@@ -204,7 +364,6 @@ class ProcessingPipeline:
     
     def cleanup(self):
         """Clean up temporary files"""
-        import shutil
         if self.temp_dir.exists():
             try:
                 shutil.rmtree(self.temp_dir)
@@ -212,3 +371,25 @@ class ProcessingPipeline:
             except Exception as e:
                 logger.warning(f"Failed to cleanup temp files: {e}")
 
+
+def run_pipeline(
+    input_path: Path,
+    output_path: Path,
+    script_json: str,
+    hwaccel: Optional[str] = None
+) -> Path:
+    """
+    Build and execute a pipeline (entry point for worker processes)
+    
+    The script arrives as its JSON dump: a str crosses the process
+    boundary far cheaper than a pickled tree of models, and validating
+    it back is a single pass in pydantic-core.
+    """
+    script = AIEditingScript.model_validate_json(script_json)
+    # Measured here: the job's memory is this worker's, not the API process's
+    with memory_monitor(script.job_id):
+        pipeline = ProcessingPipeline(input_path, output_path, script, hwaccel)
+        try:
+            return pipeline.execute()
+        finally:
+            pipeline.cleanup()
@@ -5,6 +5,7 @@ import logging
 from pathlib import Path
 from typing import List
 from ai_models import AudioConfig, AudioSegment
+from ffmpeg_utils import run_ffmpeg
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,39 @@ class AudioProcessor:
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
     
+    def build_normalize(self, audio):
+        """Append loudness normalization (EBU R128) to an audio stream, if enabled"""
+        if not self.config.normalization.enabled:
+            return audio
+        return audio.filter('loudnorm', I=self.config.normalization.targetLoudness, TP=-1.5, LRA=11)
+    
+    def build_adjustments(self, audio, segments: List[AudioSegment]):
+        """Append AI-determined segment volume adjustments to an audio stream"""
+        # One volume filter whose gain is re-evaluated per frame; the product of
+        # per-segment factors matches chained volume filters where segments overlap
+        factors = []
+        for segment in segments:
+            start = segment.start
+            end = segment.end
+            action = segment.action
+            intensity = segment.intensity
+            
+            if action == 'boost':
+                volume = 1 + intensity
+            elif action == 'reduce':
+                volume = 1 - (intensity * 0.5)  # Max 50% reduction
+            elif action == 'denoise':
+                # Use afftdn filter for noise reduction
+                continue
+            else:
+                continue
+            
+            factors.append(f'if(between(t,{start},{end}),{volume},1)')
+        
+        if not factors:
+            return audio
+        return audio.filter('volume', volume='*'.join(factors), eval='frame')
+    
     def normalize(self, video_path: Path) -> Path:
         """Normalize audio loudness (EBU R128)"""
         if not self.config.normalization.enabled:
@@ -27,17 +61,17 @@ class AudioProcessor:
         logger.info(f"Normalizing audio to {target_loudness} LUFS")
         
         try:
-            (
+            input_stream = ffmpeg.input(str(video_path))
+            run_ffmpeg(
                 ffmpeg
-                .input(str(video_path))
                 .output(
+                    input_stream.video,
+                    self.build_normalize(input_stream.audio),
                     str(output),
-                    af=f'loudnorm=I={target_loudness}:TP=-1.5:LRA=11',
                     vcodec='copy',
                     loglevel='error'
                 )
                 .overwrite_output()
-                .run()
             )
             logger.info("✅ Audio normalization complete")
             return output
@@ -54,37 +88,17 @@ class AudioProcessor:
         
         logger.info(f"Applying {len(segments)} audio adjustments")
         
-        # Build volume filter expressions
-        volume_filters = []
-        for segment in segments:
-            start = segment.start
-            end = segment.end
-            action = segment.action
-            intensity = segment.intensity
-            
-            if action == 'boost':
-                volume = 1 + intensity
-            elif action == 'reduce':
-                volume = 1 - (intensity * 0.5)  # Max 50% reduction
-            elif action == 'denoise':
-                # Use afftdn filter for noise reduction
-                continue
-            else:
-                continue
-            
-            volume_filters.append(
-                f"volume={volume}:enable='between(t,{start},{end})'"
-            )
+        # Build the segment volume filter
+        input_stream = ffmpeg.input(str(video_path))
+        source_audio = input_stream.audio
+        audio = self.build_adjustments(source_audio, segments)
         
-        if volume_filters:
-            af = ','.join(volume_filters)
+        if audio is not source_audio:
             try:
-                (
+                run_ffmpeg(
                     ffmpeg
-                    .input(str(video_path))
-                    .output(str(output), af=af, vcodec='copy', loglevel='error')
+                    .output(input_stream.video, audio, str(output), vcodec='copy', loglevel='error')
                     .overwrite_output()
-                    .run()
                 )
                 logger.info("✅ Audio adjustments complete")
                 return output
@@ -101,7 +115,7 @@ class AudioProcessor:
         logger.info("Removing background noise")
         
         try:
-            (
+            run_ffmpeg(
                 ffmpeg
                 .input(str(video_path))
                 .output(
@@ -111,7 +125,6 @@ class AudioProcessor:
                     loglevel='error'
                 )
                 .overwrite_output()
-                .run()
             )
             logger.info("✅ Noise reduction complete")
             return output
@@ -2,21 +2,44 @@
 
 import ffmpeg
 import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 from ai_models import Highlight, Transition, AIEditingScript
+from ffmpeg_utils import run_encode
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=32)
+def zoom_pieces(spans: Tuple[Tuple[float, float, float], ...]) -> Tuple[Tuple[float, float, float], ...]:
+    """
+    Non-overlapping (start, end, factor) zoom pieces for possibly overlapping spans
+    
+    Splits at every boundary and keeps the strongest zoom covering each
+    piece; unzoomed gaps are left out and equal neighbours are merged.
+    """
+    bounds = sorted({t for start, end, _ in spans for t in (start, end)})
+    pieces = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        factor = max((f for start, end, f in spans if start <= lo and hi <= end), default=1)
+        if factor == 1:
+            continue
+        if pieces and pieces[-1][1] == lo and pieces[-1][2] == factor:
+            pieces[-1] = (pieces[-1][0], hi, factor)
+        else:
+            pieces.append((lo, hi, factor))
+    return tuple(pieces)
+
 class EffectsProcessor:
     """Apply AI-determined visual effects"""
     
-    def __init__(self, script: AIEditingScript, temp_dir: Path, video_info: dict):
+    def __init__(self, script: AIEditingScript, temp_dir: Path, video_info: dict, hwaccel: Optional[str] = None):
         self.script = script
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.width = video_info['width']
         self.height = video_info['height']
+        self.hwaccel = hwaccel
     
     def apply_highlights(self, video_path: Path, highlights: List[Highlight]) -> Path:
         """Apply AI-determined effects to highlights (zoom, blur, slow-motion)"""
@@ -39,12 +62,8 @@ class EffectsProcessor:
         
         return video_path
     
-    def _apply_zoom_effects(self, video_path: Path, highlights: List[Highlight]) -> Path:
-        """Apply dynamic zoom with AI-determined intensity and easing"""
-        output = self.temp_dir / "05a_zoomed.mp4"
-        
-        logger.info(f"Applying zoom to {len(highlights)} segments")
-        
+    def build_zoom(self, video, highlights: List[Highlight]):
+        """Append a zoom-in during highlights (unchanged if nothing to zoom)"""
         # Build simple zoom conditions
         # Zoom IN during highlights, zoom OUT (1.0) otherwise
         zoom_parts = []
@@ -63,57 +82,108 @@ class EffectsProcessor:
             # Get zoom factor
             zoom_factor = self.script.get_zoom_factor(zoom_config.intensity)
             
-            # Simple condition: if in this highlight, zoom to factor, else 1.0
-            zoom_parts.append(f"if(between(t,{start},{end}),{zoom_factor},1)")
+            # Only zoom-ins: at <= 1 the scaled frame would be smaller than the crop
+            if zoom_factor <= 1:
+                continue
+            
+            zoom_parts.append((start, end, zoom_factor))
         
-        # Combine with max() to handle overlaps
-        # FFmpeg max() takes only 2 arguments, so we must chain them: max(a, max(b, c))
         if not zoom_parts:
-            final_zoom = "1"
-        elif len(zoom_parts) == 1:
-            final_zoom = zoom_parts[0]
-        else:
-            # Recursive max construction
-            final_zoom = zoom_parts[0]
-            for part in zoom_parts[1:]:
-                final_zoom = f"max({final_zoom},{part})"
+            return video
+        
+        pieces = zoom_pieces(tuple(zoom_parts))
+        if not pieces:
+            return video
         
-        # Determine zoom center based on orientation
+        # Zooming = scaling up by the factor, then cropping back to the frame.
+        # sendcmd only switches the scale size and crop offsets at piece edges,
+        # so outside highlights both are pass-throughs (no per-frame expression)
         is_vertical = self.height > self.width
+        commands = []
+        for start, end, factor in pieces:
+            zoom_w = round(self.width * factor / 2) * 2
+            zoom_h = round(self.height * factor / 2) * 2
+            # crop's in_w/in_h stay those of the first (unzoomed) frame, so
+            # the offsets are computed from the zoomed size here
+            crop_x = (zoom_w - self.width) // 2
+            if is_vertical:
+                # Vertical: Focus on upper part (faces usually) - 35% from top
+                crop_y = min(max(round(zoom_h * 0.35 - self.height / 2), 0), zoom_h - self.height)
+            else:
+                # Horizontal: Focus on center
+                crop_y = (zoom_h - self.height) // 2
+            commands.append(
+                f"{start}-{end} "
+                f"[enter] scale@zoom w {zoom_w}, [enter] scale@zoom h {zoom_h}, "
+                f"[enter] crop@zoom x {crop_x}, [enter] crop@zoom y {crop_y}, "
+                f"[leave] scale@zoom w {self.width}, [leave] scale@zoom h {self.height}, "
+                f"[leave] crop@zoom x 0, [leave] crop@zoom y 0;\n"
+            )
+        commands_file = self.temp_dir / "zoom_commands.txt"
+        commands_file.write_text(''.join(commands))
         
         if is_vertical:
-            # Vertical: Focus on upper part (faces usually) - 35% from top
-            center_x = "iw/2-(iw/zoom/2)"
-            center_y = "ih*0.35-(ih/zoom/2)"
             logger.info("Vertical video detected: Zooming to upper-center")
         else:
-            # Horizontal: Focus on center
-            center_x = "iw/2-(iw/zoom/2)"
-            center_y = "ih/2-(ih/zoom/2)"
             logger.info("Horizontal video detected: Zooming to center")
         
         # Debug logging
-        logger.info(f"Zoom parts ({len(zoom_parts)}): {zoom_parts}")
-        logger.info(f"Final zoom expression: {final_zoom}")
+        logger.info(f"Zoom pieces ({len(pieces)}): {list(pieces)}")
+        
+        return (
+            video
+            .filter('sendcmd', f=str(commands_file))
+            .filter('scale@zoom', self.width, self.height)
+            .filter('crop@zoom', self.width, self.height, 0, 0)
+        )
+    
+    def build_blur(self, video, highlights: List[Highlight]):
+        """Append timed boxblur filters for highlights with a blur effect"""
+        for highlight in highlights:
+            start = highlight.start
+            end = highlight.end
+            blur_config = highlight.effects.blur
+            
+            # Calculate blur radius from intensity (0-100 -> 0-20)
+            radius = int(blur_config.intensity / 5)
+            
+            if blur_config.type != 'background':
+                # Edge blur
+                radius //= 2
+            # Background blur would need a complex filter_complex for selective
+            # blur; for now both blur the entire frame
+            
+            # A zero radius leaves frames unchanged, so no filter for it
+            if radius == 0:
+                continue
+            
+            video = video.filter('boxblur', luma_radius=radius, enable=f'between(t,{start},{end})')
+        
+        return video
+    
+    def build_highlights(self, video, highlights: List[Highlight]):
+        """Append all highlight effects, in the order apply_highlights runs them"""
+        video = self.build_zoom(video, [h for h in highlights if h.effects.zoom])
+        return self.build_blur(video, [h for h in highlights if h.effects.blur])
+    
+    def _apply_zoom_effects(self, video_path: Path, highlights: List[Highlight]) -> Path:
+        """Apply dynamic zoom with AI-determined intensity and easing"""
+        output = self.temp_dir / "05a_zoomed.mp4"
+        
+        logger.info(f"Applying zoom to {len(highlights)} segments")
+        
+        input_stream = ffmpeg.input(str(video_path))
+        source_video = input_stream.video
+        video = self.build_zoom(source_video, highlights)
+        if video is source_video:
+            return video_path
         
         try:
-            # Use filter() method to avoid quote escaping issues
-            # Split audio and video to preserve audio
-            input_stream = ffmpeg.input(str(video_path))
-            video = input_stream.video.filter('zoompan', z=final_zoom, x=center_x, y=center_y, d=1, fps=30)
-            audio = input_stream.audio
-            
-            (
-                ffmpeg
-                .output(video, audio, str(output), acodec='copy', loglevel='error')
-                .overwrite_output()
-                .run()
-            )
+            run_encode((video, input_stream['a?']), str(output), self.hwaccel, acodec='copy')
             logger.info(f"✅ Zoom effects applied to {len(highlights)} segments")
             return output
         except ffmpeg.Error as e:
             logger.warning(f"Zoom effects failed: {e}")
-            logger.warning(f"Zoom expression was: z={final_zoom}, x={center_x}, y={center_y}")
             return video_path
     
     def _apply_blur_effects(self, video_path: Path, highlights: List[Highlight]) -> Path:
@@ -122,38 +192,15 @@ class EffectsProcessor:
         
         logger.info(f"Applying blur to {len(highlights)} segments")
         
-        # Build blur filter with enable expressions
-        blur_filters = []
-        for highlight in highlights:
-            start = highlight.start
-            end = highlight.end
-            blur_config = highlight.effects.blur
-            
-            # Calculate blur radius from intensity (0-100 -> 0-20)
-            radius = int(blur_config.intensity / 5)
-            
-            if blur_config.type == 'background':
-                # Background blur (would need complex filter_complex for selective blur)
-                # For now, apply simple blur to entire frame
-                blur_filters.append(
-                    f"boxblur=luma_radius={radius}:enable='between(t,{start},{end})'"
-                )
-            else:
-                # Edge blur
-                blur_filters.append(
-                    f"boxblur=luma_radius={radius//2}:enable='between(t,{start},{end})'"
-                )
+        # Build blur filters with enable expressions
+        input_stream = ffmpeg.input(str(video_path))
+        source_video = input_stream.video
+        video = self.build_blur(source_video, highlights)
         
-        if blur_filters:
-            vf = ','.join(blur_filters)
+        # Every radius rounded to zero: nothing to render
+        if video is not source_video:
             try:
-                (
-                    ffmpeg
-                    .input(str(video_path))
-                    .output(str(output), vf=vf, acodec='copy', loglevel='error')
-                    .overwrite_output()
-                    .run()
-                )
+                run_encode((video, input_stream['a?']), str(output), self.hwaccel, acodec='copy')
                 logger.info(f"✅ Blur effects applied to {len(highlights)} segments")
                 return output
             except ffmpeg.Error as e:
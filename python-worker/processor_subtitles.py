@@ -2,20 +2,76 @@
 
 import ffmpeg
 import logging
+import re
 from pathlib import Path
+from typing import List, Optional
 from ai_models import SubtitleConfig
+from ffmpeg_utils import run_encode
 
 logger = logging.getLogger(__name__)
 
+# Subtitle position -> ASS alignment (numpad layout)
+ASS_ALIGNMENT = {
+    'top': 8,
+    'center': 5,
+    'bottom': 2
+}
+
+def highlight_keyword(match: re.Match) -> str:
+    """Color a matched keyword yellow, then back to white"""
+    return f"{{\\c&H00FFFF&}}{match.group(0)}{{\\c&HFFFFFF&}}"
+
+def _trie_regex(node: dict) -> str:
+    """Regex for a keyword trie node; '' marks the end of a keyword"""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in node.items() if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if '' in node:
+        # A keyword ends here; greedy ? still prefers the longer ones
+        body = f"(?:{body})?"
+    return body
+
+def compile_keywords(keywords: List[str]) -> Optional[re.Pattern]:
+    """
+    One pattern for all keywords, so each line is scanned once
+    
+    The keywords are laid out as a prefix trie: at each character at most
+    one branch can continue, so matching doesn't slow down with the number
+    of keywords (a flat alternation tries every keyword at every position).
+    The longest keyword wins, so one inside a longer one doesn't split it.
+    """
+    trie = {}
+    for keyword in keywords:
+        if not keyword:
+            continue
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    if not trie:
+        return None
+    return re.compile(_trie_regex(trie))
+
 class SubtitleProcessor:
     """Generate and apply AI-styled subtitles"""
     
-    def __init__(self, subtitle_config: SubtitleConfig, temp_dir: Path, video_info: dict):
+    def __init__(self, subtitle_config: SubtitleConfig, temp_dir: Path, video_info: dict, hwaccel: Optional[str] = None):
         self.config = subtitle_config
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.width = video_info['width']
         self.height = video_info['height']
+        self.hwaccel = hwaccel
+        self._keyword_pattern = compile_keywords(self.config.keywords or [])
+    
+    def build_subtitles(self, video):
+        """Write the ASS file and append the filter that burns it in (unchanged if no segments)"""
+        if not self.config.segments:
+            return video
+        
+        ass_path = self._create_ass_file()
+        return video.filter('subtitles', filename=str(ass_path))
     
     def add_subtitles(self, video_path: Path) -> Path:
         """Add AI-styled subtitles with keyword highlighting"""
@@ -46,12 +102,7 @@ class SubtitleProcessor:
             video = input_stream.video.filter('subtitles', filename=subtitle_file)
             audio = input_stream.audio
             
-            (
-                ffmpeg
-                .output(video, audio, str(output), acodec='copy', loglevel='error')
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True)
-            )
+            run_encode((video, audio), str(output), self.hwaccel, acodec='copy')
             
             # Validate output was created
             if not output.exists() or output.stat().st_size == 0:
@@ -91,13 +142,7 @@ class SubtitleProcessor:
         
         logger.info(f"Subtitle config: Font={font_size}px, Margin={margin_v}px (Vertical={is_vertical})")
         
-        # Position mapping
-        alignment_map = {
-            'top': 8,
-            'center': 5,
-            'bottom': 2
-        }
-        alignment = alignment_map[self.config.style.position]
+        alignment = ASS_ALIGNMENT[self.config.style.position]
         
         # Color conversion (white = &H00FFFFFF in BGR)
         color = '&H00FFFFFF'  # Default white
@@ -120,34 +165,28 @@ Style: Keyword,{self.config.style.font},{int(font_size*1.1)},&H0000FFFF,&H000000
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
         
-        with open(ass_path, 'w', encoding='utf-8') as f:
-            f.write(header)
+        parts = [header]
+        for segment in self.config.segments:
+            start = self._format_time_ass(segment.start)
+            end = self._format_time_ass(segment.end)
+            # Newlines would break the ASS line structure
+            text = segment.text.replace('\n', ' ').replace('\r', '')
             
-            for segment in self.config.segments:
-                start = self._format_time_ass(segment.start)
-                end = self._format_time_ass(segment.end)
-                text = segment.text.replace('\n', ' ').replace('\r', '')
-                # Sanitize text for ASS (remove commas if they break parsing, though usually fine in text field)
-                # But definitely handle newlines which break the ASS line structure
-                
-                # Highlight keywords
-                if self.config.keywords:
-                    for keyword in self.config.keywords:
-                        if keyword in text:
-                            # Yellow highlight
-                            text = text.replace(
-                                keyword,
-                                f"{{\\c&H00FFFF&}}{keyword}{{\\c&HFFFFFF&}}"
-                            )
-                
-                f.write(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}\n")
+            # Highlight keywords (yellow)
+            if self._keyword_pattern:
+                text = self._keyword_pattern.sub(highlight_keyword, text)
+            
+            parts.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}\n")
+        
+        # Encode once and hand the whole file to a single write (no text layer)
+        ass_path.write_bytes(''.join(parts).encode('utf-8'))
         
         return ass_path
     
     def _format_time_ass(self, seconds: float) -> str:
         """Format time for ASS subtitles (H:MM:SS.cs)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        centisecs = int((seconds * 100) % 100)
+        # Round: seconds * 100 can land just below the integer (1.29 -> 128.99...)
+        total_secs, centisecs = divmod(round(seconds * 100), 100)
+        total_minutes, secs = divmod(total_secs, 60)
+        hours, minutes = divmod(total_minutes, 60)
         return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
@@ -1,35 +1,48 @@
 # Video Processor - AI-driven video processing
 
+import bisect
 import ffmpeg
 import logging
+import os
+import subprocess
 from pathlib import Path
-from typing import List
-from ai_models import JumpCut, VisualConfig, AspectRatio
+from typing import List, Optional, Tuple
+from ai_models import JumpCut, VisualConfig, AspectRatio, ColorParams
+from ffmpeg_utils import concat_copy, probe_keyframes, run_encode, run_ffmpeg
 
 logger = logging.getLogger(__name__)
 
+# How far (seconds) a kept segment's start may be from a keyframe for the
+# jump cuts to be stream-copied
+KEYFRAME_TOLERANCE = 0.01
+
+# CRF of the jump-cut re-encode (AUTOCUT_JUMP_CUT_CRF overrides); 20 is still
+# visually lossless and the file is only an intermediate
+JUMP_CUT_CRF = int(os.environ.get("AUTOCUT_JUMP_CUT_CRF", 20))
+
+# Color grading presets: (filter, options) chains
+COLOR_PRESETS = {
+    'vibrant': (('eq', {'contrast': 1.1, 'saturation': 1.3}), ('curves', {'preset': 'strong_contrast'})),
+    'cinematic': (('eq', {'contrast': 1.1, 'saturation': 0.9}), ('colorbalance', {'rs': 0.05, 'bs': -0.05})),
+    'natural': (('eq', {'saturation': 1.1}),)
+}
+
 class VideoProcessor:
     """Process video based on AI instructions"""
     
-    def __init__(self, visual_config: VisualConfig, temp_dir: Path, video_info: dict):
+    def __init__(self, visual_config: VisualConfig, temp_dir: Path, video_info: dict, hwaccel: Optional[str] = None):
         self.config = visual_config
         self.temp_dir = temp_dir
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.width = video_info['width']
         self.height = video_info['height']
         self.duration = video_info['duration']
+        self.fps = video_info['fps']
+        self.has_audio = video_info['has_audio']
+        self.hwaccel = hwaccel
     
-    def apply_jump_cuts(self, video_path: Path, cuts: List[JumpCut]) -> Path:
-        """Remove unwanted segments (AI-determined jump cuts)"""
-        if not cuts:
-            logger.info("No jump cuts to apply")
-            return video_path
-        
-        output = self.temp_dir / "04_jump_cuts.mp4"
-        
-        logger.info(f"Applying {len(cuts)} jump cuts")
-        
-        # Calculate segments to keep
+    def _keep_segments(self, cuts: List[JumpCut]) -> List[Tuple[float, float]]:
+        """Segments of the source that survive the jump cuts"""
         keep_segments = []
         current_time = 0.0
         
@@ -43,18 +56,100 @@ class VideoProcessor:
         if current_time < self.duration:
             keep_segments.append((current_time, self.duration))
         
+        return keep_segments
+    
+    def build_cuts(self, video, audio, cuts: List[JumpCut]):
+        """Drop cut segments from the video (and audio, if given) and close the gaps"""
+        select_expr = '+'.join(
+            f'between(t,{start},{end})' for start, end in self._keep_segments(cuts)
+        )
+        # select leaves the frame rate unset; without fps the encoder falls
+        # back to 25 fps and drops frames
+        video = (
+            video.filter('select', select_expr)
+            .filter('setpts', 'N/FRAME_RATE/TB')
+            .filter('fps', self.fps)
+        )
+        if audio is not None:
+            audio = audio.filter('aselect', select_expr).filter('asetpts', 'N/SR/TB')
+        return video, audio
+    
+    def build_color(self, video):
+        """Append the configured color grading to a video stream"""
+        preset = self.config.colorGrading.preset
+        if preset == 'custom':
+            return self._build_custom_grading(video)
+        for name, options in COLOR_PRESETS.get(preset, COLOR_PRESETS['vibrant']):
+            video = video.filter(name, **options)
+        return video
+    
+    def build_aspect(self, video):
+        """Scale/crop a video stream to the target frame (Orientation Aware); returns (stream, width, height)"""
+        # Detect input orientation
+        is_vertical = self.height > self.width
+        
+        # Determine target based on input (Smart Mode)
+        if is_vertical:
+            target_width, target_height = 1080, 1920
+            logger.info(f"Detected Vertical Video ({self.width}x{self.height}) -> Target 9:16")
+        else:
+            target_width, target_height = 1920, 1080
+            logger.info(f"Detected Horizontal Video ({self.width}x{self.height}) -> Target 16:9")
+            
+        # Already the target frame: nothing to scale or crop
+        if (self.width, self.height) == (target_width, target_height):
+            return video, target_width, target_height
+        
+        # Calculate scaling/cropping
+        current_ar = self.width / self.height
+        target_ar = target_width / target_height
+        
+        if abs(current_ar - target_ar) < 0.01:
+            # Aspect ratio matches, just scale if needed
+            video = self._scale_to(video, target_width, target_height)
+        else:
+            # Center crop strategy: crop in input pixels first, so the scaler
+            # only works on what is kept (setsar: crop rounding skews the SAR)
+            if current_ar > target_ar:
+                # Video is wider than target - crop width
+                video = video.filter('crop', f'trunc(ih*{target_width}/{target_height}/2)*2', 'ih')
+            else:
+                # Video is taller than target - crop height
+                video = video.filter('crop', 'iw', f'trunc(iw*{target_height}/{target_width}/2)*2')
+            video = self._scale_to(video, target_width, target_height).filter('setsar', 1)
+        
+        return video, target_width, target_height
+    
+    def _scale_to(self, video, target_width: int, target_height: int):
+        """Scale to the target size; big downscales (UHD -> 1080p) go through a cheap 2x box average first"""
+        if min(self.width / target_width, self.height / target_height) >= 2:
+            video = video.filter('scale', 'trunc(iw/4)*2', 'trunc(ih/4)*2', flags='area')
+        return video.filter('scale', target_width, target_height)
+    
+    def apply_jump_cuts(self, video_path: Path, cuts: List[JumpCut]) -> Path:
+        """Remove unwanted segments (AI-determined jump cuts)"""
+        if not cuts:
+            logger.info("No jump cuts to apply")
+            return video_path
+        
+        output = self.temp_dir / "04_jump_cuts.mp4"
+        
+        logger.info(f"Applying {len(cuts)} jump cuts")
+        
+        # Calculate segments to keep
+        keep_segments = self._keep_segments(cuts)
+        
         logger.info(f"Keeping {len(keep_segments)} segments: {keep_segments}")
         
         # If only one segment, just trim
         if len(keep_segments) == 1:
             start, end = keep_segments[0]
             try:
-                (
+                run_ffmpeg(
                     ffmpeg
                     .input(str(video_path), ss=start, t=end-start)
                     .output(str(output), c='copy', loglevel='error')
                     .overwrite_output()
-                    .run()
                 )
                 logger.info(f"Trimmed to {start}-{end}s")
                 return output
@@ -62,69 +157,43 @@ class VideoProcessor:
                 logger.error(f"Trim failed: {e}")
                 return video_path
         
-        # Multiple segments - use concat
-        # Create segment files with RE-ENCODE (not copy) to ensure A/V sync
-        segment_files = []
-        for i, (start, end) in enumerate(keep_segments):
-            segment_file = self.temp_dir / f"segment_{i}.mp4"
-            try:
-                (
-                    ffmpeg
-                    .input(str(video_path), ss=start, t=end-start)
-                    .output(
-                        str(segment_file), 
-                        vcodec='libx264',
-                        acodec='aac',
-                        preset='fast',
-                        crf=18,
-                        loglevel='error'
-                    )
-                    .overwrite_output()
-                    .run()
-                )
-                segment_files.append(segment_file)
-                logger.info(f"Created segment {i}: {start:.2f}-{end:.2f}s")
-            except ffmpeg.Error as e:
-                logger.error(f"Segment {i} failed: {e}")
-                return video_path
-        
-        # Concat segments
-        if segment_files:
+        # Multiple segments starting on keyframes - stream copy, no re-encode
+        if self._starts_on_keyframes(video_path, keep_segments):
             try:
-                # Create concat file list
-                concat_file = self.temp_dir / "concat_list.txt"
-                with open(concat_file, 'w') as f:
-                    for seg in segment_files:
-                        f.write(f"file '{seg.absolute()}'\n")
-                
-                # Concat with re-encode for perfect sync
-                (
-                    ffmpeg
-                    .input(str(concat_file), format='concat', safe=0)
-                    .output(
-                        str(output),
-                        vcodec='libx264',
-                        acodec='aac',
-                        preset='fast',
-                        crf=18,
-                        loglevel='error'
-                    )
-                    .overwrite_output()
-                    .run()
-                )
-                
-                # Cleanup segment files
-                for seg in segment_files:
-                    seg.unlink()
-                concat_file.unlink()
-                
-                logger.info(f"✅ Jump cuts applied ({len(cuts)} segments removed)")
+                concat_copy(video_path, keep_segments, output)
+                logger.info(f"✅ Jump cuts applied by stream copy ({len(cuts)} segments removed)")
                 return output
             except ffmpeg.Error as e:
-                logger.error(f"Concat failed: {e}")
-                return video_path
+                logger.warning(f"Stream-copy concat failed, re-encoding instead: {e}")
         
-        return video_path
+        # Multiple segments - one pass: select the kept frames/samples from the
+        # source and re-encode once (re-encoding keeps A/V in sync)
+        input_stream = ffmpeg.input(str(video_path))
+        audio = input_stream.audio if self.has_audio else None
+        video, audio = self.build_cuts(input_stream.video, audio, cuts)
+        streams = (video, audio) if audio is not None else (video,)
+        
+        try:
+            run_encode(streams, str(output), self.hwaccel, crf=JUMP_CUT_CRF, acodec='aac')
+            logger.info(f"✅ Jump cuts applied ({len(cuts)} segments removed)")
+            return output
+        except ffmpeg.Error as e:
+            logger.error(f"Jump cuts failed: {e}")
+            return video_path
+    
+    def _starts_on_keyframes(self, video_path: Path, keep_segments: List[Tuple[float, float]]) -> bool:
+        """Whether every kept segment starts on a keyframe (so it can be copied without re-encoding)"""
+        try:
+            keyframes = probe_keyframes(video_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Keyframe probe failed: {e}")
+            return False
+        
+        for start, _ in keep_segments:
+            i = bisect.bisect_left(keyframes, start - KEYFRAME_TOLERANCE)
+            if i == len(keyframes) or keyframes[i] > start + KEYFRAME_TOLERANCE:
+                return False
+        return True
     
     def apply_color_grading(self, video_path: Path) -> Path:
         """Apply AI-determined color grading"""
@@ -133,24 +202,16 @@ class VideoProcessor:
         preset = self.config.colorGrading.preset
         logger.info(f"Applying {preset} color grading")
         
-        # Presets
-        presets = {
-            'vibrant': 'eq=contrast=1.1:saturation=1.3,curves=preset=strong_contrast',
-            'cinematic': 'eq=contrast=1.1:saturation=0.9,colorbalance=rs=0.05:bs=-0.05',
-            'natural': 'eq=saturation=1.1',
-            'custom': self._build_custom_grading()
-        }
+        input_stream = ffmpeg.input(str(video_path))
+        source_video = input_stream.video
+        video = self.build_color(source_video)
         
-        vf = presets.get(preset, presets['vibrant'])
+        if video is source_video:
+            logger.info("Neutral color grading, skipping")
+            return video_path
         
         try:
-            (
-                ffmpeg
-                .input(str(video_path))
-                .output(str(output), vf=vf, acodec='copy', loglevel='error')
-                .overwrite_output()
-                .run()
-            )
+            run_encode((video, input_stream['a?']), str(output), self.hwaccel, acodec='copy')
             logger.info("✅ Color grading applied")
             return output
         except ffmpeg.Error as e:
@@ -161,53 +222,33 @@ class VideoProcessor:
         """Convert to target aspect ratio (Orientation Aware)"""
         output = self.temp_dir / "09_final_output.mp4"
         
-        # Detect input orientation
-        is_vertical = self.height > self.width
-        
-        # Determine target based on input (Smart Mode)
-        if is_vertical:
-            target_width, target_height = 1080, 1920
-            logger.info(f"Detected Vertical Video ({self.width}x{self.height}) -> Target 9:16")
-        else:
-            target_width, target_height = 1920, 1080
-            logger.info(f"Detected Horizontal Video ({self.width}x{self.height}) -> Target 16:9")
-            
-        # Calculate scaling/cropping
-        current_ar = self.width / self.height
-        target_ar = target_width / target_height
+        input_stream = ffmpeg.input(str(video_path))
+        source_video = input_stream.video
+        video, target_width, target_height = self.build_aspect(source_video)
         
-        if abs(current_ar - target_ar) < 0.01:
-            # Aspect ratio matches, just scale if needed
-            vf = f'scale={target_width}:{target_height}'
-        else:
-            # Center crop strategy
-            if current_ar > target_ar:
-                # Video is wider than target - scale height, crop width
-                vf = f'scale=-1:{target_height},crop={target_width}:{target_height}'
-            else:
-                # Video is taller than target - scale width, crop height
-                vf = f'scale={target_width}:-1,crop={target_width}:{target_height}'
+        if video is source_video:
+            logger.info(f"Already {target_width}x{target_height}, skipping conversion")
+            return video_path
         
         try:
-            (
-                ffmpeg
-                .input(str(video_path))
-                .output(str(output), vf=vf, acodec='copy', loglevel='error')
-                .overwrite_output()
-                .run()
-            )
+            run_encode((video, input_stream['a?']), str(output), self.hwaccel, acodec='copy')
             logger.info(f"✅ Converted to {target_width}x{target_height}")
             return output
         except ffmpeg.Error as e:
             logger.error(f"Aspect ratio conversion failed: {e}")
             return video_path
     
-    def _build_custom_grading(self) -> str:
+    def _build_custom_grading(self, video):
         """Build custom color grading filter"""
-        params = self.config.colorGrading.customParams or {}
-        
-        contrast = params.get('contrast', 1.0)
-        saturation = params.get('saturation', 1.0)
-        brightness = params.get('brightness', 0.0)
-        
-        return f'eq=contrast={contrast}:saturation={saturation}:brightness={brightness}'
+        params = self.config.colorGrading.customParams or ColorParams()
+        
+        # Neutral eq: leave the stream alone
+        if (params.contrast, params.saturation, params.brightness) == (1.0, 1.0, 0.0):
+            return video
+        
+        return video.filter(
+            'eq',
+            contrast=params.contrast,
+            saturation=params.saturation,
+            brightness=params.brightness
+        )
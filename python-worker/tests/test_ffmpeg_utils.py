@@ -0,0 +1,114 @@
+"""
+Tests for ffmpeg_utils
+Tests how long filter graphs are moved out of the ffmpeg command line,
+and how stuck ffmpeg runs are detected
+"""
+
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path to import ffmpeg_utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ffmpeg
+import pytest
+import ffmpeg_utils
+from ffmpeg_utils import FILTER_SCRIPT_MIN_LENGTH, _filter_scripts, run_ffmpeg
+
+
+class TestFilterScripts:
+    """Test _filter_scripts function"""
+
+    def test_short_graphs_stay_inline(self):
+        """Arguments are unchanged when every graph is short"""
+        args = ['ffmpeg', '-i', 'in.mp4', '-vf', 'scale=1080:1920', '-af', 'anull', 'out.mp4']
+        assert _filter_scripts(args) == (args, [])
+
+    def test_long_graphs_move_to_scripts(self):
+        """Long -vf/-af/-filter_complex values are replaced by script files"""
+        graph = "select='" + "+".join(["between(t,1,2)"] * 2000) + "'"
+        assert len(graph) >= FILTER_SCRIPT_MIN_LENGTH
+        args = ['ffmpeg', '-i', 'in.mp4', '-filter_complex', graph, '-vf', graph, '-af', 'a' + graph, 'out.mp4']
+
+        new_args, scripts = _filter_scripts(args)
+        try:
+            assert new_args == [
+                'ffmpeg', '-i', 'in.mp4',
+                '-filter_complex_script', scripts[0],
+                '-filter_script:v', scripts[1],
+                '-filter_script:a', scripts[2],
+                'out.mp4'
+            ]
+            assert Path(scripts[0]).read_text(encoding='utf-8') == graph
+            assert Path(scripts[2]).read_text(encoding='utf-8') == 'a' + graph
+        finally:
+            for script in scripts:
+                os.unlink(script)
+
+    def test_long_non_filter_values_stay_inline(self):
+        """Only filter options are moved (e.g. not a long output path)"""
+        args = ['ffmpeg', '-i', 'x' * FILTER_SCRIPT_MIN_LENGTH, 'out.mp4']
+        assert _filter_scripts(args) == (args, [])
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+class TestRunFFmpeg:
+    """Test run_ffmpeg function"""
+
+    def test_successful_run(self, tmp_path):
+        """A normal run finishes and writes its output"""
+        output = tmp_path / 'out.mp4'
+        run_ffmpeg(
+            ffmpeg
+            .input('testsrc=s=64x64:d=0.5', format='lavfi')
+            .output(str(output), loglevel='error')
+            .overwrite_output()
+        )
+        assert output.stat().st_size > 0
+
+    def test_failure_carries_stderr(self, tmp_path):
+        """A failed run raises ffmpeg.Error with ffmpeg's message"""
+        with pytest.raises(ffmpeg.Error) as e:
+            run_ffmpeg(ffmpeg.input(str(tmp_path / 'missing.mp4')).output(str(tmp_path / 'out.mp4')))
+        assert b'missing.mp4' in e.value.stderr
+
+    def test_busy_run_without_output_is_not_killed(self, tmp_path, monkeypatch):
+        """Decoding through a long stretch select drops counts as progress"""
+        monkeypatch.setattr(ffmpeg_utils, 'FFMPEG_STALL_TIMEOUT', 1)
+        output = tmp_path / 'out.mp4'
+        run_ffmpeg(
+            ffmpeg
+            .input('testsrc2=s=1280x720:r=30:d=60', format='lavfi')
+            .output(str(output), vf="select='gte(t,59)'", loglevel='error')
+            .overwrite_output()
+        )
+        assert output.stat().st_size > 0
+
+    def test_stalled_run_is_killed(self, tmp_path, monkeypatch):
+        """A run whose input never delivers data is killed after the stall timeout"""
+        monkeypatch.setattr(ffmpeg_utils, 'FFMPEG_STALL_TIMEOUT', 1)
+        fifo = tmp_path / 'input.ts'
+        os.mkfifo(fifo)
+        # Hold the FIFO open for writing without ever writing to it
+        writers = []
+        threading.Thread(target=lambda: writers.append(open(fifo, 'wb')), daemon=True).start()
+
+        try:
+            with pytest.raises(ffmpeg.Error) as e:
+                run_ffmpeg(
+                    ffmpeg
+                    .input(str(fifo), format='mpegts')
+                    .output(str(tmp_path / 'out.mp4'), loglevel='error')
+                    .overwrite_output()
+                )
+            assert b'no progress for 1s' in e.value.stderr
+        finally:
+            for writer in writers:
+                writer.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,139 @@
+"""
+Tests for JobStatusStore
+Tests LRU bounding and TTL expiry of job statuses, and the shared
+SQLite-backed store
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import job_store
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from pydantic import BaseModel
+import job_store
+from job_store import JobStatusStore, SqliteJobStatusStore
+
+
+class Status(BaseModel):
+    job_id: str
+    progress: int = 0
+
+
+class TestJobStatusStore:
+    """Test JobStatusStore class"""
+
+    def test_set_get_delete(self):
+        store = JobStatusStore()
+        store["a"] = 1
+        assert "a" in store
+        assert store["a"] == 1
+        del store["a"]
+        assert "a" not in store
+        with pytest.raises(KeyError):
+            store["a"]
+
+    def test_evicts_least_recently_written(self):
+        store = JobStatusStore(maxsize=2)
+        store["a"] = 1
+        store["b"] = 2
+        store["a"] = 3  # rewrite moves "a" to the fresh end
+        store["c"] = 4
+        assert "b" not in store
+        assert store["a"] == 3
+        assert store["c"] == 4
+        assert len(store) == 2
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(job_store.time, "monotonic", lambda: now[0])
+        store = JobStatusStore(ttl=10)
+        store["a"] = 1
+        now[0] += 5
+        assert store.get("a") == 1
+        now[0] += 6
+        assert store.get("a") is None
+        assert len(store) == 0
+
+    def test_active_entries_do_not_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(job_store.time, "monotonic", lambda: now[0])
+        store = JobStatusStore(ttl=10, is_active=lambda value: value == "running")
+        store["a"] = "running"
+        store["b"] = "done"
+        now[0] += 20
+        store["c"] = "done"  # sweeps past the still-running "a"
+        assert store.get("a") == "running"
+        assert store.get("b") is None
+        assert len(store) == 2
+        store["a"] = "finished"
+        now[0] += 20
+        assert store.get("a") is None
+
+    def test_pop_missing_returns_default(self):
+        store = JobStatusStore()
+        assert store.pop("missing") is None
+        store["a"] = 1
+        assert store.pop("a") == 1
+        assert "a" not in store
+
+
+class TestSqliteJobStatusStore:
+    """Test SqliteJobStatusStore class"""
+
+    def test_set_get_delete(self, tmp_path):
+        store = SqliteJobStatusStore(tmp_path / "status.db", Status)
+        store["a"] = Status(job_id="a", progress=10)
+        assert "a" in store
+        assert store["a"] == Status(job_id="a", progress=10)
+        assert store.get_json("a") == '{"job_id":"a","progress":10}'
+        del store["a"]
+        assert "a" not in store
+        with pytest.raises(KeyError):
+            store["a"]
+
+    def test_shared_between_connections(self, tmp_path):
+        writer = SqliteJobStatusStore(tmp_path / "status.db", Status)
+        reader = SqliteJobStatusStore(tmp_path / "status.db", Status)
+        writer["a"] = Status(job_id="a")
+        writer["a"] = Status(job_id="a", progress=50)
+        assert reader["a"].progress == 50
+        assert len(reader) == 1
+
+    def test_opened_on_first_use(self, tmp_path):
+        store = SqliteJobStatusStore(tmp_path / "status.db", Status)
+        assert not (tmp_path / "status.db").exists()
+        assert "a" not in store
+        assert (tmp_path / "status.db").exists()
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_forked_child_opens_its_own_connection(self, tmp_path):
+        store = SqliteJobStatusStore(tmp_path / "status.db", Status)
+        store["a"] = Status(job_id="a")
+        parent_conn = store._conn
+        pid = os.fork()
+        if pid == 0:
+            try:
+                store["b"] = Status(job_id="b")
+                os._exit(0 if store._conn is not parent_conn else 1)
+            except BaseException:
+                os._exit(2)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert store._conn is parent_conn
+        assert store["b"] == Status(job_id="b")
+
+    def test_entries_expire_after_ttl(self, tmp_path, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(job_store.time, "time", lambda: now[0])
+        store = SqliteJobStatusStore(tmp_path / "status.db", Status, ttl=10)
+        store["a"] = Status(job_id="a")
+        now[0] += 5
+        store["b"] = Status(job_id="b")
+        now[0] += 6
+        assert store.get("a") is None
+        assert store.get("b") is not None
+        assert store.purge_expired() == 1
+        assert len(store) == 1
@@ -0,0 +1,94 @@
+"""
+Tests for processor_effects
+Tests how highlight zooms are split into non-overlapping pieces,
+and where the zoomed frame is cropped
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import processor_effects
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ffmpeg
+import pytest
+from ai_models import AIEditingScript, Highlight
+from ffmpeg_utils import run_ffmpeg
+from processor_effects import EffectsProcessor, zoom_pieces
+
+# Small test pattern: 2s at 10 fps, zoomed (1.25x) from 0.5s to 1.5s
+SOURCE = 'testsrc2=s={w}x{h}:r=10:d=2'
+ZOOMED_FRAME, UNZOOMED_FRAME = 10, 18
+
+
+class TestZoomPieces:
+    """Test zoom_pieces function"""
+
+    def test_single_span(self):
+        """One highlight becomes one piece"""
+        assert zoom_pieces(((1.0, 2.0, 1.15),)) == ((1.0, 2.0, 1.15),)
+
+    def test_disjoint_spans(self):
+        """Separate highlights stay separate, the gap is left unzoomed"""
+        pieces = zoom_pieces(((5.0, 6.0, 1.25), (1.0, 2.0, 1.15)))
+        assert pieces == ((1.0, 2.0, 1.15), (5.0, 6.0, 1.25))
+
+    def test_overlap_takes_larger_factor(self):
+        """Overlapping highlights split so the stronger zoom wins"""
+        pieces = zoom_pieces(((1.0, 3.0, 1.15), (2.0, 4.0, 1.25)))
+        assert pieces == ((1.0, 2.0, 1.15), (2.0, 4.0, 1.25))
+
+    def test_nested_same_factor_merges(self):
+        """A span inside another with the same factor adds nothing"""
+        assert zoom_pieces(((1.0, 4.0, 1.15), (2.0, 3.0, 1.15))) == ((1.0, 4.0, 1.15),)
+
+    def test_no_zoom(self):
+        """Factor 1 spans produce no pieces"""
+        assert zoom_pieces(((1.0, 2.0, 1.0),)) == ()
+
+
+def render_gray(tmp_path: Path, name: str, width: int, height: int, build) -> list:
+    """Frames of the test pattern after build(stream), as gray bytes"""
+    output = tmp_path / f'{name}.gray'
+    video = build(ffmpeg.input(SOURCE.format(w=width, h=height), format='lavfi').video)
+    run_ffmpeg(ffmpeg.output(video, str(output), format='rawvideo', pix_fmt='gray', loglevel='error').overwrite_output())
+    data = output.read_bytes()
+    size = width * height
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+class TestBuildZoom:
+    """Test EffectsProcessor.build_zoom rendering"""
+
+    def zoom(self, tmp_path: Path, width: int, height: int) -> list:
+        script = AIEditingScript(job_id='test')
+        processor = EffectsProcessor(script, tmp_path, {'width': width, 'height': height})
+        highlight = Highlight(start=0.5, end=1.5, reason='test', effects={'zoom': {'intensity': 'strong'}})
+        return render_gray(tmp_path, 'zoomed', width, height, lambda v: processor.build_zoom(v, [highlight]))
+
+    def reference(self, tmp_path: Path, width: int, height: int, x: int, y: int) -> list:
+        """The pattern statically zoomed 1.25x, cropped at (x, y)"""
+        return render_gray(
+            tmp_path, 'reference', width, height,
+            lambda v: v.filter('scale', width * 5 // 4, height * 5 // 4).filter('crop', width, height, x, y)
+        )
+
+    def test_horizontal_zooms_on_center(self, tmp_path):
+        """Landscape frames are cropped from the middle of the zoomed frame"""
+        frames = self.zoom(tmp_path, 320, 240)
+        original = render_gray(tmp_path, 'original', 320, 240, lambda v: v)
+        assert frames[ZOOMED_FRAME] == self.reference(tmp_path, 320, 240, 40, 30)[ZOOMED_FRAME]
+        assert frames[ZOOMED_FRAME] != self.reference(tmp_path, 320, 240, 0, 0)[ZOOMED_FRAME]
+        assert frames[UNZOOMED_FRAME] == original[UNZOOMED_FRAME]
+
+    def test_vertical_zooms_on_upper_center(self, tmp_path):
+        """Portrait frames are cropped around 35% height, clamped to the frame"""
+        frames = self.zoom(tmp_path, 240, 400)
+        # Zoomed to 300x500: x centered, y = 500*0.35 - 400/2 clamped to 0
+        assert frames[ZOOMED_FRAME] == self.reference(tmp_path, 240, 400, 30, 0)[ZOOMED_FRAME]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
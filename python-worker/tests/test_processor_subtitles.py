@@ -0,0 +1,58 @@
+"""
+Tests for processor_subtitles
+Tests keyword highlighting with the compiled keyword pattern
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import processor_subtitles
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from processor_subtitles import compile_keywords, highlight_keyword
+
+
+def highlight(keywords, text):
+    """Text with every keyword match highlighted"""
+    return compile_keywords(keywords).sub(highlight_keyword, text)
+
+
+class TestCompileKeywords:
+    """Test compile_keywords function"""
+
+    def test_no_keywords(self):
+        """Nothing to match gives no pattern"""
+        assert compile_keywords([]) is None
+        assert compile_keywords(['']) is None
+
+    def test_highlights_each_match(self):
+        """Every occurrence of every keyword is wrapped once"""
+        assert highlight(['cat', 'dog'], "cat and dog") == (
+            "{\\c&H00FFFF&}cat{\\c&HFFFFFF&} and {\\c&H00FFFF&}dog{\\c&HFFFFFF&}"
+        )
+
+    def test_longest_keyword_wins(self):
+        """A keyword that is a prefix of another doesn't split the longer one"""
+        assert highlight(['te', 'test', 'tested'], "tested test tea") == (
+            "{\\c&H00FFFF&}tested{\\c&HFFFFFF&} "
+            "{\\c&H00FFFF&}test{\\c&HFFFFFF&} "
+            "{\\c&H00FFFF&}te{\\c&HFFFFFF&}a"
+        )
+
+    def test_special_characters_are_literal(self):
+        """Regex metacharacters in keywords match only themselves"""
+        pattern = compile_keywords(['a.b', '(x)'])
+        assert pattern.findall("axb a.b (x) x") == ['a.b', '(x)']
+
+    def test_matches_flat_alternation(self):
+        """Same matches as a longest-first alternation of the keywords"""
+        keywords = ['ab', 'abc', 'b', 'bca', 'cab', 'c', 'abcab']
+        flat = re.compile('|'.join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+        text = "abcabcab bcab cabc aabbcc"
+        assert compile_keywords(keywords).findall(text) == flat.findall(text)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
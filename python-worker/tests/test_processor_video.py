@@ -0,0 +1,97 @@
+"""
+Tests for processor_video
+Tests that jump cuts keep the source frame rate and the kept frames
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import processor_video
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ffmpeg
+import pytest
+from ai_models import JumpCut, VisualConfig
+from ffmpeg_utils import probe_video, run_ffmpeg
+from processor_video import VideoProcessor
+
+# 6s test clip at 30 fps with a keyframe every second (GOP of 30 frames)
+FPS = 30
+DURATION = 6
+GOP = 30
+
+# Cuts inside GOPs, so they can't be stream-copied: 4.5s kept in 3 segments
+MID_GOP_CUTS = ((1.5, 2.5), (3.2, 3.7))
+MID_GOP_KEPT = 4.5
+MID_GOP_SEGMENTS = 3
+
+# select's between() keeps the frame on each end of a kept segment
+SELECT_FRAMES_PER_SEGMENT = 1
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory) -> Path:
+    """Test pattern with a sine tone, keyframes exactly every GOP frames"""
+    path = tmp_path_factory.mktemp('clip') / 'clip.mp4'
+    video = ffmpeg.input(f'testsrc2=s=160x120:r={FPS}:d={DURATION}', format='lavfi')
+    audio = ffmpeg.input(f'sine=frequency=440:duration={DURATION}', format='lavfi')
+    run_ffmpeg(
+        ffmpeg
+        .output(
+            video, audio, str(path),
+            vcodec='libx264', preset='ultrafast', g=GOP, keyint_min=GOP, sc_threshold=0,
+            pix_fmt='yuv420p', acodec='aac', loglevel='error'
+        )
+        .overwrite_output()
+    )
+    return path
+
+
+def video_frames(path: Path) -> tuple:
+    """(r_frame_rate, decoded frame count) of a file's video stream"""
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-count_frames', '-select_streams', 'v',
+         '-show_entries', 'stream=r_frame_rate,nb_read_frames', '-of', 'csv=p=0', str(path)],
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    rate, frames = out.split(',')
+    return rate, int(frames)
+
+
+def jump_cuts(cuts) -> list:
+    return [JumpCut(start=start, end=end, reason='test') for start, end in cuts]
+
+
+def processor(clip: Path, tmp_path: Path) -> VideoProcessor:
+    return VideoProcessor(VisualConfig(), tmp_path, probe_video(clip))
+
+
+class TestJumpCutFrameRate:
+    """Jump cuts must not fall back to ffmpeg's 25 fps default"""
+
+    def test_build_cuts_keeps_source_rate(self, clip, tmp_path):
+        """The select graph outputs the source rate and one frame per kept 1/fps"""
+        source = ffmpeg.input(str(clip))
+        video, audio = processor(clip, tmp_path).build_cuts(source.video, source.audio, jump_cuts(MID_GOP_CUTS))
+        output = tmp_path / 'cut.mp4'
+        run_ffmpeg(ffmpeg.output(video, audio, str(output), vcodec='libx264', preset='ultrafast', loglevel='error'))
+
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - MID_GOP_KEPT * FPS) <= MID_GOP_SEGMENTS * SELECT_FRAMES_PER_SEGMENT
+
+    def test_apply_jump_cuts_keeps_source_rate(self, clip, tmp_path):
+        """The staged jump-cut step (re-encode path) keeps the source rate"""
+        output = processor(clip, tmp_path).apply_jump_cuts(clip, jump_cuts(MID_GOP_CUTS))
+
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - MID_GOP_KEPT * FPS) <= MID_GOP_SEGMENTS * SELECT_FRAMES_PER_SEGMENT
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -10,7 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pytest
-from timeline_manager import TimelineManager, TimeInterval, adjust_subtitle_timestamps
+from timeline_manager import TimelineManager, TimeInterval, adjust_subtitle_timestamps, adjust_segment_timestamps
 
 
 class TestTimeInterval:
@@ -139,6 +139,17 @@ class TestTimelineManager:
         # Beyond duration
         assert timeline.map_timestamp(100.0) == 55.0  # Edited duration
     
+    def test_map_timestamps_batch(self):
+        """Test batch mapping matches single mapping, in input order"""
+        timeline = TimelineManager(60.0)
+        timeline.add_cut(30.0, 40.0)
+        timeline.add_cut(10.0, 15.0)
+        
+        timestamps = [50.0, 5.0, 35.0, 12.0, 20.0, -1.0, 100.0, 15.0]
+        
+        assert timeline.map_timestamps(timestamps) == [35.0, 5.0, 25.0, 10.0, 15.0, 0.0, 45.0, 10.0]
+        assert timeline.map_timestamps(timestamps) == [timeline.map_timestamp(t) for t in timestamps]
+    
     def test_kept_segments(self):
         """Test getting kept segments"""
         timeline = TimelineManager(60.0)
@@ -168,7 +179,40 @@ class TestTimelineManager:
         # Out of bounds
         assert timeline.validate_timestamp(-1.0) is False
         assert timeline.validate_timestamp(100.0) is False
-    
+
+    def test_cut_added_after_mapping(self):
+        """Test cuts added after a lookup are taken into account"""
+        timeline = TimelineManager(60.0)
+        timeline.add_cut(10.0, 20.0)
+
+        assert timeline.map_timestamp(30.0) == 20.0
+        assert timeline.validate_timestamp(25.0) is True
+
+        timeline.add_cut(22.0, 27.0)
+
+        assert timeline.map_timestamp(30.0) == 15.0
+        assert timeline.validate_timestamp(25.0) is False
+        assert timeline.validate_timestamp(20.0) is False  # Cut ends are cut
+        assert timeline.get_edited_duration() == 45.0
+
+    def test_drop_short_segments(self):
+        """Test slivers between nearby cuts are cut too"""
+        timeline = TimelineManager(60.0)
+        timeline.add_cut(10.0, 20.0)
+        timeline.add_cut(20.1, 30.0)
+
+        assert timeline.drop_short_segments(0.25) == [(20.0, 20.1)]
+        assert timeline.get_kept_segments() == [(0.0, 10.0), (30.0, 60.0)]
+        assert timeline.map_timestamp(40.0) == 20.0
+
+    def test_drop_short_segments_keeps_only_content(self):
+        """Test nothing is cut when every kept segment is short"""
+        timeline = TimelineManager(1.0)
+        timeline.add_cut(0.1, 0.9)
+
+        assert timeline.drop_short_segments(0.25) == []
+        assert timeline.get_edited_duration() == pytest.approx(0.2)
+
     def test_summary(self):
         """Test summary generation"""
         timeline = TimelineManager(60.0)
@@ -184,6 +228,20 @@ class TestTimelineManager:
         assert summary['merged_cuts'] == 2  # First two overlapping merged
         assert summary['kept_segments'] == 3
 
+    def test_summary_cuts_at_edges(self):
+        """Cuts touching the start/end leave no kept segment there"""
+        timeline = TimelineManager(60.0)
+        assert timeline.get_summary()['kept_segments'] == 1
+
+        timeline.add_cut(0.0, 10.0)
+        timeline.add_cut(50.0, 60.0)
+        assert timeline.get_summary()['kept_segments'] == 1
+
+        timeline.add_cut(10.0, 50.0)
+        summary = timeline.get_summary()
+        assert summary['kept_segments'] == len(timeline.get_kept_segments()) == 0
+        assert summary['edited_duration'] == 0.0
+
 
 class TestSubtitleAdjustment:
     """Test subtitle timestamp adjustment"""
@@ -281,6 +339,24 @@ class TestSubtitleAdjustment:
         # Sub 6: shifted by all cuts (25s)
         assert adjusted[3]['start'] == 55.0  # 80 - 25
         assert adjusted[3]['end'] == 60.0    # 85 - 25
+    
+    def test_segment_objects(self):
+        """Test adjusting objects with .start/.end in place of dicts"""
+        timeline = TimelineManager(60.0)
+        timeline.add_cut(10.0, 15.0)
+        
+        segments = [
+            TimeInterval(5.0, 8.0),     # Before cut
+            TimeInterval(11.0, 14.0),   # Inside cut
+            TimeInterval(20.0, 25.0),   # After cut
+        ]
+        
+        adjusted = adjust_segment_timestamps(segments, timeline)
+        
+        assert adjusted == [
+            (segments[0], 5.0, 8.0),
+            (segments[2], 15.0, 20.0),
+        ]
 
 
 class TestEdgeCases:
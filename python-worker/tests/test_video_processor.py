@@ -0,0 +1,193 @@
+"""
+Tests for video_processor
+Tests which path jump cuts take (stream copy or select re-encode), the
+frames they keep, and that subtitles and highlights follow snapped cuts
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import video_processor
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ffmpeg
+import pytest
+import video_processor
+from ffmpeg_utils import concat_copy, run_ffmpeg
+from video_processor import ProcessingOptions, VideoProcessor
+
+# 6s test clip at 30 fps with a keyframe every second (GOP of 30 frames)
+FPS = 30
+DURATION = 6
+GOP = 30
+
+# Cuts on keyframes: 4s kept in 3 segments, each starting on a keyframe
+KEYFRAME_CUTS = ((1, 2), (3, 4))
+KEYFRAME_KEPT = 4
+KEYFRAME_SEGMENTS = 3
+
+# Cuts inside GOPs: 4.5s kept in 3 segments; snapped, the second cut ends at
+# the 3s keyframe and overlaps the kept 2-3.2s, leaving (0, 1.5) and (2, 6)
+MID_GOP_CUTS = ((1.5, 2.5), (3.2, 3.7))
+MID_GOP_KEPT = 4.5
+MID_GOP_SEGMENTS = 3
+SNAPPED_SEGMENTS = [(0, 1.5), (2.0, DURATION)]
+SNAPPED_KEPT = 5.5
+
+# Tolerated extra/missing frames per kept segment: the concat demuxer may
+# copy a packet past an outpoint; select's between() keeps both end frames
+COPY_FRAMES_PER_SEGMENT = 2
+SELECT_FRAMES_PER_SEGMENT = 1
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory) -> Path:
+    """Upload-style "<job_id>_input.mp4" with keyframes exactly every GOP frames"""
+    uploads = tmp_path_factory.mktemp('job') / 'uploads'
+    uploads.mkdir()
+    path = uploads / 'test_input.mp4'
+    video = ffmpeg.input(f'testsrc2=s=160x120:r={FPS}:d={DURATION}', format='lavfi')
+    audio = ffmpeg.input(f'sine=frequency=440:duration={DURATION}', format='lavfi')
+    run_ffmpeg(
+        ffmpeg
+        .output(
+            video, audio, str(path),
+            vcodec='libx264', preset='ultrafast', g=GOP, keyint_min=GOP, sc_threshold=0,
+            pix_fmt='yuv420p', acodec='aac', loglevel='error'
+        )
+        .overwrite_output()
+    )
+    return path
+
+
+def video_frames(path) -> tuple:
+    """(r_frame_rate, decoded frame count) of a file's video stream"""
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-count_frames', '-select_streams', 'v',
+         '-show_entries', 'stream=r_frame_rate,nb_read_frames', '-of', 'csv=p=0', str(path)],
+        capture_output=True, text=True, check=True
+    ).stdout.strip()
+    rate, frames = out.split(',')
+    return rate, int(frames)
+
+
+def jump_cuts(cuts) -> list:
+    return [{'start': start, 'end': end} for start, end in cuts]
+
+
+def processor(clip: Path, **options) -> VideoProcessor:
+    return VideoProcessor(str(clip), str(clip.parent / 'out.mp4'), ProcessingOptions(**options))
+
+
+@pytest.fixture
+def paths(monkeypatch) -> list:
+    """Names of the jump-cut paths taken ('copy' / 'select'), in call order"""
+    taken = []
+
+    def spy(name, func):
+        def wrapper(*args, **kwargs):
+            taken.append(name)
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(video_processor, 'concat_copy', spy('copy', video_processor.concat_copy))
+    monkeypatch.setattr(video_processor, 'run_encode', spy('select', video_processor.run_encode))
+    return taken
+
+
+class TestKeyframes:
+    """Keyframe checks used to choose between stream copy and re-encoding"""
+
+    def test_starts_on_keyframes(self, clip):
+        vp = processor(clip)
+        assert vp._starts_on_keyframes([(0, 1), (2, 3), (4, 6)])
+        # Within KEYFRAME_TOLERANCE of a keyframe still counts
+        assert vp._starts_on_keyframes([(0, 1), (2.005, 6)])
+        assert not vp._starts_on_keyframes([(0, 1.5), (2.5, 6)])
+
+    def test_snap_moves_starts_back_and_merges(self, clip):
+        vp = processor(clip)
+        requested = vp._requested_keep_segments(jump_cuts(MID_GOP_CUTS))
+        assert requested == [(0, 1.5), (2.5, 3.2), (3.7, DURATION)]
+        assert vp._snap_to_keyframes(requested) == SNAPPED_SEGMENTS
+
+
+class TestConcatCopy:
+    """The concat list goes to ffmpeg's stdin, no list file is written"""
+
+    def test_copies_segments_of_awkward_path(self, clip, tmp_path):
+        # Quote and space in the name exercise the list's quoting
+        source = tmp_path / "it's a clip.mp4"
+        shutil.copy(clip, source)
+        output = tmp_path / 'out.mp4'
+
+        concat_copy(source, [(0, 1), (2, 3)], output)
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted([source.name, output.name])
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - 2 * FPS) <= 2 * COPY_FRAMES_PER_SEGMENT
+
+
+class TestApplyJumpCuts:
+    """Stream copy when every kept segment starts on a keyframe, select otherwise"""
+
+    def test_keyframe_cuts_are_copied(self, clip, paths):
+        output = processor(clip).apply_jump_cuts(jump_cuts(KEYFRAME_CUTS))
+
+        assert paths == ['copy']
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - KEYFRAME_KEPT * FPS) <= KEYFRAME_SEGMENTS * COPY_FRAMES_PER_SEGMENT
+
+    def test_mid_gop_cuts_are_reencoded(self, clip, paths):
+        output = processor(clip).apply_jump_cuts(jump_cuts(MID_GOP_CUTS))
+
+        assert paths == ['select']
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - MID_GOP_KEPT * FPS) <= MID_GOP_SEGMENTS * SELECT_FRAMES_PER_SEGMENT
+
+    def test_snapped_mid_gop_cuts_are_copied(self, clip, paths):
+        output = processor(clip, snap_cuts_to_keyframes=True).apply_jump_cuts(jump_cuts(MID_GOP_CUTS))
+
+        assert paths == ['copy']
+        rate, frames = video_frames(output)
+        assert rate == f'{FPS}/1'
+        assert abs(frames - SNAPPED_KEPT * FPS) <= len(SNAPPED_SEGMENTS) * COPY_FRAMES_PER_SEGMENT
+
+
+class TestAlignToCuts:
+    """Snapping keeps the half GOP before 2.5s, so later items play 0.5s later"""
+
+    CUTS = [{'start': 1.5, 'end': 2.5}]
+    SUBTITLES = [
+        {'start': 0.5, 'end': 1.0, 'text': 'before'},
+        {'start': 1.0, 'end': 1.5, 'text': 'up to the cut'},
+        {'start': 2.0, 'end': 3.0, 'text': 'after'},
+    ]
+
+    def test_snapped_cuts_shift_later_items(self, clip):
+        aligned = processor(clip, snap_cuts_to_keyframes=True).align_to_cuts(self.CUTS, self.SUBTITLES)
+
+        assert [(s['start'], s['end'], s['text']) for s in aligned] == [
+            (0.5, 1.0, 'before'),
+            (1.0, 1.5, 'up to the cut'),
+            (2.5, 3.5, 'after'),
+        ]
+
+    def test_unsnapped_cuts_leave_items_alone(self, clip):
+        assert processor(clip).align_to_cuts(self.CUTS, self.SUBTITLES) is self.SUBTITLES
+
+    def test_cuts_on_keyframes_leave_items_alone(self, clip):
+        cuts = [{'start': 1.5, 'end': 2.0}]
+        aligned = processor(clip, snap_cuts_to_keyframes=True).align_to_cuts(cuts, self.SUBTITLES)
+        assert aligned is self.SUBTITLES
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,7 +1,9 @@
 # Timeline Manager - Handle timeline transformations after jump cuts
 # Fixes the subtitle synchronization bug
 
-from typing import List, Tuple, Optional
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Any, List, Sequence, Tuple, Optional
 from dataclasses import dataclass
 
 
@@ -51,6 +53,9 @@ class TimelineManager:
         self.original_duration = original_duration
         self.removed_intervals: List[TimeInterval] = []
         self._sorted = True
+        # (merged cuts, cut starts, cut ends, removed-before prefix sum),
+        # built on first use and dropped whenever a cut is added
+        self._cut_index: Optional[Tuple[List[TimeInterval], List[float], List[float], List[float]]] = None
     
     def add_cut(self, start: float, end: float) -> None:
         """
@@ -75,6 +80,7 @@ class TimelineManager:
         # Add to removed intervals
         self.removed_intervals.append(TimeInterval(start, end))
         self._sorted = False
+        self._cut_index = None
     
     def _ensure_sorted(self):
         """Ensure removed intervals are sorted by start time"""
@@ -82,6 +88,19 @@ class TimelineManager:
             self.removed_intervals.sort(key=lambda x: x.start)
             self._sorted = True
     
+    def _get_cut_index(self) -> Tuple[List[TimeInterval], List[float], List[float], List[float]]:
+        """Merged cuts with their starts, ends and removed-time prefix sum (cached until the next add_cut)"""
+        if self._cut_index is None:
+            merged_cuts = self._build_merged_cuts()
+            self._cut_index = (
+                merged_cuts,
+                [cut.start for cut in merged_cuts],
+                [cut.end for cut in merged_cuts],
+                # removed_before[k]: total duration of the first k cuts
+                list(accumulate((cut.duration for cut in merged_cuts), initial=0.0)),
+            )
+        return self._cut_index
+    
     def _merge_overlapping_cuts(self) -> List[TimeInterval]:
         """
         Merge overlapping cuts into continuous segments
@@ -89,6 +108,10 @@ class TimelineManager:
         Returns:
             List of non-overlapping merged intervals
         """
+        return self._get_cut_index()[0]
+    
+    def _build_merged_cuts(self) -> List[TimeInterval]:
+        """Sort the cuts and merge overlapping/adjacent ones"""
         if not self.removed_intervals:
             return []
         
@@ -121,32 +144,53 @@ class TimelineManager:
         Returns:
             Timestamp in edited video after cuts applied
         """
-        if original_timestamp < 0:
-            return 0
-        
-        if original_timestamp > self.original_duration:
-            return self.get_edited_duration()
-        
-        # Merge overlapping cuts first
-        merged_cuts = self._merge_overlapping_cuts()
+        return self.map_timestamps([original_timestamp])[0]
+    
+    def map_timestamps(self, timestamps: List[float]) -> List[float]:
+        """
+        Map many timestamps from original timeline to edited timeline
         
-        # Calculate total time removed before this timestamp
-        removed_before = 0.0
+        Each timestamp is placed among the merged cuts by binary search, with
+        the removed time looked up in a prefix sum, so N timestamps and M cuts
+        cost O(N log M) once the cut index is built (O(M log M), cached
+        until the next add_cut) and need no sorting.
         
-        for cut in merged_cuts:
-            if cut.end <= original_timestamp:
-                # This cut is entirely before the timestamp
-                removed_before += cut.duration
-            elif cut.start < original_timestamp < cut.end:
-                # Timestamp falls inside a cut
-                # Map it to the cut start point (after adjustment)
-                removed_before += (original_timestamp - cut.start)
-                return cut.start - removed_before
+        Args:
+            timestamps: Timestamps in original video (any order)
+            
+        Returns:
+            Mapped timestamps, in the same order as the input
+        """
+        _, cut_starts, cut_ends, removed_before = self._get_cut_index()
+        edited_duration = self.original_duration - removed_before[-1]
+
+        if not cut_starts:
+            # No cuts: the edited timeline is the original one, clamped
+            return [
+                0.0 if timestamp < 0 else edited_duration if timestamp > edited_duration else timestamp
+                for timestamp in timestamps
+            ]
+
+        mapped = []
+        for timestamp in timestamps:
+            if timestamp < 0:
+                mapped.append(0.0)
+                continue
+            
+            if timestamp > self.original_duration:
+                mapped.append(edited_duration)
+                continue
+            
+            # Cuts ending at or before this timestamp
+            k = bisect_right(cut_ends, timestamp)
+            
+            if k < len(cut_starts) and cut_starts[k] < timestamp:
+                # Timestamp falls inside a cut: map it to the cut start point
+                mapped.append(cut_starts[k] - removed_before[k])
             else:
-                # Cut is after timestamp, stop counting
-                break
+                mapped.append(timestamp - removed_before[k])
         
-        return original_timestamp - removed_before
+        return mapped
     
     def get_edited_duration(self) -> float:
         """
@@ -155,9 +199,7 @@ class TimelineManager:
         Returns:
             Duration after all cuts applied
         """
-        merged_cuts = self._merge_overlapping_cuts()
-        total_removed = sum(cut.duration for cut in merged_cuts)
-        return self.original_duration - total_removed
+        return self.original_duration - self._get_cut_index()[3][-1]
     
     def get_kept_segments(self) -> List[Tuple[float, float]]:
         """
@@ -185,6 +227,27 @@ class TimelineManager:
         
         return segments
     
+    def drop_short_segments(self, min_duration: float) -> List[Tuple[float, float]]:
+        """
+        Cut kept segments shorter than min_duration (slivers between nearby cuts)
+        
+        Nothing is cut if every kept segment is that short.
+        
+        Args:
+            min_duration: Shortest kept segment to leave in, in seconds
+        
+        Returns:
+            The (start, end) segments that were cut
+        """
+        segments = self.get_kept_segments()
+        short = [(start, end) for start, end in segments if end - start < min_duration]
+        if len(short) == len(segments):
+            return []
+        
+        for start, end in short:
+            self.add_cut(start, end)
+        return short
+    
     def validate_timestamp(self, timestamp: float) -> bool:
         """
         Check if timestamp falls in a kept segment
@@ -195,25 +258,38 @@ class TimelineManager:
         Returns:
             True if timestamp is in kept segment, False if it's cut
         """
-        merged_cuts = self._merge_overlapping_cuts()
+        _, cut_starts, cut_ends, _ = self._get_cut_index()
         
-        for cut in merged_cuts:
-            if cut.contains(timestamp):
-                return False
+        # The only cut that can contain it: the first one not ending before it
+        k = bisect_left(cut_ends, timestamp)
+        if k < len(cut_starts) and cut_starts[k] <= timestamp:
+            return False
         
         return 0 <= timestamp <= self.original_duration
     
     def get_summary(self) -> dict:
         """Get summary of timeline transformations"""
-        merged_cuts = self._merge_overlapping_cuts()
+        merged_cuts, _, _, removed_before = self._get_cut_index()
+        total_removed = removed_before[-1]
+        
+        # Kept segments are the gaps around the merged cuts (never empty
+        # between two of them), plus any time before the first/after the last
+        if merged_cuts:
+            kept_segments = (
+                len(merged_cuts) - 1
+                + (merged_cuts[0].start > 0)
+                + (merged_cuts[-1].end < self.original_duration)
+            )
+        else:
+            kept_segments = 1
         
         return {
             'original_duration': self.original_duration,
-            'edited_duration': self.get_edited_duration(),
+            'edited_duration': self.original_duration - total_removed,
             'total_cuts': len(self.removed_intervals),
             'merged_cuts': len(merged_cuts),
-            'total_removed': sum(cut.duration for cut in merged_cuts),
-            'kept_segments': len(self.get_kept_segments()),
+            'total_removed': total_removed,
+            'kept_segments': kept_segments,
         }
 
 
@@ -231,22 +307,15 @@ def adjust_subtitle_timestamps(
     Returns:
         List of adjusted subtitles (only those not completely cut)
     """
+    # Map every start and end in one pass over the cuts
+    mapped = timeline.map_timestamps(
+        [t for subtitle in subtitles for t in (subtitle['start'], subtitle['end'])]
+    )
+    
     adjusted = []
     
-    for subtitle in subtitles:
-        start = subtitle['start']
-        end = subtitle['end']
-        
-        # Check if subtitle is completely within a cut
-        if not timeline.validate_timestamp(start) and not timeline.validate_timestamp(end):
-            # Both start and end are cut, skip this subtitle
-            continue
-        
-        # Map timestamps to new timeline
-        new_start = timeline.map_timestamp(start)
-        new_end = timeline.map_timestamp(end)
-        
-        # Ensure we have valid duration
+    for subtitle, new_start, new_end in zip(subtitles, mapped[0::2], mapped[1::2]):
+        # Subtitles completely inside cuts collapse to zero length and are dropped
         if new_end > new_start:
             adjusted_subtitle = subtitle.copy()
             adjusted_subtitle['start'] = new_start
@@ -254,3 +323,24 @@ def adjust_subtitle_timestamps(
             adjusted.append(adjusted_subtitle)
     
     return adjusted
+
+
+def adjust_segment_timestamps(
+    segments: Sequence[Any],
+    timeline: TimelineManager
+) -> List[Tuple[Any, float, float]]:
+    """
+    Map segment objects (anything with .start and .end) onto the edited timeline
+    
+    Like adjust_subtitle_timestamps, but for model objects: nothing is
+    copied, so callers build the adjusted objects once (e.g. model_copy).
+    
+    Returns:
+        (segment, new_start, new_end) for each segment not completely cut
+    """
+    mapped = timeline.map_timestamps([t for segment in segments for t in (segment.start, segment.end)])
+    return [
+        (segment, new_start, new_end)
+        for segment, new_start, new_end in zip(segments, mapped[0::2], mapped[1::2])
+        if new_end > new_start
+    ]
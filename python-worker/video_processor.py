@@ -1,57 +1,90 @@
+import bisect
 import ffmpeg
 import os
 import logging
+import subprocess
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass
 import math
+from itertools import accumulate
+from ffmpeg_utils import concat_copy, probe_keyframes, probe_video, run_encode, run_ffmpeg
+from processor_subtitles import compile_keywords, highlight_keyword
+from timeline_manager import TimelineManager, adjust_subtitle_timestamps
 
 logger = logging.getLogger(__name__)
 
+ASPECT_RATIO_STRATEGIES = frozenset(("center_crop", "blur_background"))
+
+# How far (seconds) a kept segment may start from a keyframe and still be stream-copied
+KEYFRAME_TOLERANCE = 0.01
+
+# Output frame size (9:16)
+TARGET_WIDTH, TARGET_HEIGHT = 1080, 1920
+
+# "Punch in" zoom factor during highlights
+HIGHLIGHT_ZOOM = 1.15
+
+# Color grading presets as -vf filter chains
+COLOR_GRADING_FILTERS = {
+    "vibrant": "eq=contrast=1.1:saturation=1.3,curves=preset=strong_contrast",
+    "cinematic": "eq=contrast=1.1:saturation=0.9,colorbalance=rs=0.05:bs=-0.05",
+    "natural": "eq=saturation=1.1"
+}
+
+@dataclass(slots=True)
 class ProcessingOptions:
-    def __init__(
-        self,
-        subtitle_style: str = "professional",
-        color_grading: str = "vibrant",
-        enable_zoom: bool = True,
-        enable_transitions: bool = True,
-        aspect_ratio_strategy: str = "center_crop" # center_crop or blur_background
-    ):
-        self.subtitle_style = subtitle_style
-        self.color_grading = color_grading
-        self.enable_zoom = enable_zoom
-        self.enable_transitions = enable_transitions
-        self.aspect_ratio_strategy = aspect_ratio_strategy
+    subtitle_style: str = "professional"
+    color_grading: str = "vibrant"
+    enable_zoom: bool = True
+    enable_transitions: bool = True
+    aspect_ratio_strategy: str = "center_crop" # center_crop or blur_background
+    snap_cuts_to_keyframes: bool = False # end each cut at the keyframe before it (keeps up to a GOP of it) so cuts can be stream-copied
+
+    def __post_init__(self):
+        if self.aspect_ratio_strategy not in ASPECT_RATIO_STRATEGIES:
+            raise ValueError(f"Unknown aspect ratio strategy: {self.aspect_ratio_strategy}")
 
 class VideoProcessor:
-    def __init__(self, input_path: str, output_path: str, options: ProcessingOptions):
+    def __init__(self, input_path: str, output_path: str, options: ProcessingOptions, hwaccel: Optional[str] = None):
         self.input_path = Path(input_path)
         self.output_path = Path(output_path)
         self.options = options
+        # Hardware H.264 encoder for every pass (detect_hardware_accel() result)
+        self.hwaccel = hwaccel
         self.temp_dir = self.input_path.parent.parent / "processing"
         self.temp_dir.mkdir(exist_ok=True)
+        # Intermediate files are prefixed with the job id ("<job_id>_input.mp4" upload)
+        # so concurrent jobs don't overwrite each other and cleanup can find them
+        self.job_prefix = self.input_path.stem.removesuffix("_input")
         
-        # Get video info
+        # Get video info (cached per file version, so another processor for
+        # the same upload doesn't spawn ffprobe again)
         try:
-            probe = ffmpeg.probe(str(self.input_path))
-            video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-            self.width = int(video_info['width'])
-            self.height = int(video_info['height'])
-            self.duration = float(video_info['duration'])
+            video_info = probe_video(self.input_path)
+            self.width = video_info['width']
+            self.height = video_info['height']
+            self.duration = video_info['duration']
+            self.fps = video_info['fps']
         except Exception as e:
             logger.error(f"Error probing video: {e}")
             raise
 
+    def _temp_file(self, name: str) -> Path:
+        """Path for a job-scoped intermediate file"""
+        return self.temp_dir / f"{self.job_prefix}_{name}"
+
     def format_time_ass(self, seconds: float) -> str:
         """Format time for ASS subtitles (H:MM:SS.cs)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        centisecs = int((seconds * 100) % 100)
+        # Round: seconds * 100 can land just below the integer (1.29 -> 128.99...)
+        total_secs, centisecs = divmod(round(seconds * 100), 100)
+        total_minutes, secs = divmod(total_secs, 60)
+        hours, minutes = divmod(total_minutes, 60)
         return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
 
     def create_ass(self, subtitles: List[Dict], keywords: List[str] = None) -> Path:
         """Create Advanced Substation Alpha subtitle file with Pro styling"""
-        ass_path = self.temp_dir / "subtitles.ass"
+        ass_path = self._temp_file("subtitles.ass")
         
         # Calculate font size based on video height (approx 4-5% of height)
         font_size = int(self.height * 0.045)
@@ -76,27 +109,25 @@ Style: Keyword,Kanit ExtraBold,{int(font_size*1.1)},&H0000FFFF,&H000000FF,&H0000
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
         
-        with open(ass_path, "w", encoding="utf-8") as f:
-            f.write(header)
+        # All keywords in one alternation, so each line is scanned once
+        # (and a highlight tag is never matched by a later keyword)
+        keyword_pattern = compile_keywords(keywords or [])
+        
+        parts = [header]
+        for sub in subtitles:
+            start = self.format_time_ass(sub['start'])
+            end = self.format_time_ass(sub['end'])
+            text = sub['text']
+            
+            # Highlight keywords with color (Yellow: &H0000FFFF in BGR)
+            if keyword_pattern:
+                text = keyword_pattern.sub(highlight_keyword, text)
             
-            for sub in subtitles:
-                start = self.format_time_ass(sub['start'])
-                end = self.format_time_ass(sub['end'])
-                text = sub['text']
-                
-                # Check for keywords to highlight
-                style = "Default"
-                if keywords:
-                    for keyword in keywords:
-                        if keyword in text:
-                            # Highlight keyword with color (Yellow: &H0000FFFF in BGR)
-                            # Note: ASS uses BGR, so Yellow is 00FFFF
-                            text = text.replace(keyword, f"{{\\c&H00FFFF&}}{keyword}{{\\c&HFFFFFF&}}")
-                            # Or switch to Keyword style for the whole line if it's short
-                            # style = "Keyword" 
-                
-                f.write(f"Dialogue: 0,{start},{end},{style},,0,0,0,,{text}\n")
-                
+            parts.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text}\n")
+        
+        # One encode and one write for the whole file
+        ass_path.write_bytes(''.join(parts).encode('utf-8'))
+        
         return ass_path
 
     def apply_jump_cuts(self, jump_cuts: List[Dict]) -> str:
@@ -104,9 +135,43 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         if not jump_cuts:
             return str(self.input_path)
             
-        output_file = self.temp_dir / "jump_cut_output.mp4"
+        output_file = self._temp_file("jump_cut_output.mp4")
+        
+        keep_segments = self._keep_segments(jump_cuts)
+        
+        # Every kept segment starts on a keyframe - stream copy, no re-encode
+        if self._starts_on_keyframes(keep_segments):
+            try:
+                concat_copy(self.input_path, keep_segments, output_file)
+                logger.info(f"✅ Jump cuts applied by stream copy ({len(keep_segments)} segments kept)")
+                return str(output_file)
+            except ffmpeg.Error as e:
+                logger.warning(f"Stream-copy concat failed, re-encoding instead: {e}")
         
-        # Calculate keep segments
+        select_expr = self._select_expr(jump_cuts)
+        
+        try:
+            run_encode(
+                (ffmpeg.input(str(self.input_path)),),
+                str(output_file),
+                self.hwaccel,
+                vf=f"select='{select_expr}',setpts=N/FRAME_RATE/TB,fps={self.fps}",
+                af=f"aselect='{select_expr}',asetpts=N/SR/TB"
+            )
+            return str(output_file)
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error applying jump cuts: {e.stderr.decode() if e.stderr else str(e)}")
+            raise
+
+    def _keep_segments(self, jump_cuts: List[Dict]) -> List[Tuple[float, float]]:
+        """(start, end) of the parts outside the jump cuts (snapped to keyframes if enabled)"""
+        keep_segments = self._requested_keep_segments(jump_cuts)
+        if self.options.snap_cuts_to_keyframes:
+            keep_segments = self._snap_to_keyframes(keep_segments)
+        return keep_segments
+
+    def _requested_keep_segments(self, jump_cuts: List[Dict]) -> List[Tuple[float, float]]:
+        """(start, end) of the parts outside the jump cuts, exactly as requested"""
         keep_segments = []
         current_time = 0.0
         
@@ -123,205 +188,313 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
             
         if current_time < self.duration:
             keep_segments.append((current_time, self.duration))
-            
-        # Create filter complex
-        segments = []
-        for start, end in keep_segments:
-            segments.append(f"between(t,{start},{end})")
-            
-        select_expr = "+".join(segments)
         
+        return keep_segments
+
+    def align_to_cuts(self, jump_cuts: List[Dict], timed: List[Dict]) -> List[Dict]:
+        """
+        Subtitles/highlights (timed on the edited timeline of the requested
+        cuts) moved to where their frames end up once the cuts are applied
+        
+        Only snapping changes anything: each kept segment it extends starts
+        earlier, so everything after it plays later.
+        """
+        if not (jump_cuts and timed and self.options.snap_cuts_to_keyframes):
+            return timed
+        
+        requested = self._requested_keep_segments(jump_cuts)
+        snapped = self._snap_to_keyframes(requested)
+        if snapped == requested:
+            return timed
+        
+        # Edited time -> source time over the requested segments (a time on a
+        # boundary starts the next segment, or ends the previous one)...
+        edited_starts = list(accumulate((end - start for start, end in requested), initial=0.0))
+        
+        def to_source(t: float, find) -> float:
+            k = min(max(find(edited_starts, t) - 1, 0), len(requested) - 1)
+            return requested[k][0] + t - edited_starts[k]
+        
+        # ...then onto the edited timeline of the snapped segments
+        timeline = TimelineManager(self.duration)
+        position = 0.0
+        for start, end in snapped:
+            if start > position:
+                timeline.add_cut(position, start)
+            position = end
+        if position < self.duration:
+            timeline.add_cut(position, self.duration)
+        
+        return adjust_subtitle_timestamps(
+            [
+                {**item, 'start': to_source(item['start'], bisect.bisect_right), 'end': to_source(item['end'], bisect.bisect_left)}
+                for item in timed
+            ],
+            timeline
+        )
+
+    def _keyframes(self) -> Optional[Tuple[float, ...]]:
+        """Keyframe times of the input, or None if they can't be probed"""
         try:
-            (
-                ffmpeg
-                .input(str(self.input_path))
-                .output(
-                    str(output_file),
-                    vf=f"select='{select_expr}',setpts=N/FRAME_RATE/TB",
-                    af=f"aselect='{select_expr}',asetpts=N/SR/TB",
-                    loglevel='error'
-                )
-                .overwrite_output()
-                .run()
-            )
-            return str(output_file)
-        except ffmpeg.Error as e:
-            logger.error(f"FFmpeg error applying jump cuts: {e.stderr.decode() if e.stderr else str(e)}")
-            raise
+            return probe_keyframes(self.input_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"Keyframe probe failed: {e}")
+            return None
+
+    def _snap_to_keyframes(self, keep_segments: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """
+        Move each kept segment's start back to the keyframe at or before it
+        
+        Keeps up to a GOP of the cut material, so the segments can be copied
+        rather than re-encoded. A cut shorter than that disappears: its
+        neighbouring segments are merged.
+        """
+        keyframes = self._keyframes()
+        if not keyframes:
+            return keep_segments
+        
+        snapped = []
+        for start, end in keep_segments:
+            i = bisect.bisect_right(keyframes, start + KEYFRAME_TOLERANCE)
+            if i:
+                start = min(start, keyframes[i - 1])
+            if snapped and start <= snapped[-1][1]:
+                snapped[-1] = (snapped[-1][0], end)
+            else:
+                snapped.append((start, end))
+        return snapped
+
+    def _starts_on_keyframes(self, keep_segments: List[Tuple[float, float]]) -> bool:
+        """Whether every kept segment starts on a keyframe (so it can be copied without re-encoding)"""
+        keyframes = self._keyframes()
+        if not keyframes:
+            return False
+        
+        for start, _ in keep_segments:
+            i = bisect.bisect_left(keyframes, start - KEYFRAME_TOLERANCE)
+            if i == len(keyframes) or keyframes[i] > start + KEYFRAME_TOLERANCE:
+                return False
+        return True
+
+    def _select_expr(self, jump_cuts: List[Dict]) -> str:
+        """select/aselect expression keeping everything outside the jump cuts"""
+        return "+".join(
+            f"between(t,{start},{end})" for start, end in self._keep_segments(jump_cuts)
+        )
+
+    def color_filter(self, style: str = "vibrant") -> str:
+        """-vf chain for a color grading preset (to fold into another pass)"""
+        return COLOR_GRADING_FILTERS.get(style, COLOR_GRADING_FILTERS["vibrant"])
 
     def add_color_grading(self, video_path: str, style: str = "vibrant") -> str:
         """Apply color grading"""
-        output_file = self.temp_dir / "graded_output.mp4"
-        
-        # Define presets
-        presets = {
-            "vibrant": "eq=contrast=1.1:saturation=1.3,curves=preset=strong_contrast",
-            "cinematic": "eq=contrast=1.1:saturation=0.9,colorbalance=rs=0.05:bs=-0.05",
-            "natural": "eq=saturation=1.1"
-        }
+        output_file = self._temp_file("graded_output.mp4")
         
-        filter_str = presets.get(style, presets["vibrant"])
+        filter_str = self.color_filter(style)
         
         try:
-            (
-                ffmpeg
-                .input(video_path)
-                .output(str(output_file), vf=filter_str, acodec='copy', loglevel='error')
-                .overwrite_output()
-                .run()
-            )
+            run_encode((ffmpeg.input(video_path),), str(output_file), self.hwaccel, vf=filter_str, acodec='copy')
             return str(output_file)
         except ffmpeg.Error as e:
             logger.error(f"FFmpeg error applying color grading: {e.stderr.decode() if e.stderr else str(e)}")
             raise
 
-    def add_subtitles(self, subtitles: List[Dict], video_path: str, keywords: List[str] = None) -> str:
-        """Add subtitles using ASS format"""
-        output_file = self.temp_dir / "subtitled_output.mp4"
+    def add_subtitles(self, subtitles: List[Dict], video_path: str, keywords: List[str] = None,
+                      color_grading: Optional[str] = None) -> str:
+        """Add subtitles using ASS format (after the color_grading preset, if given, in the same pass)"""
+        output_file = self._temp_file("subtitled_output.mp4")
         
         try:
-            ass_path = self.create_ass(subtitles, keywords)
+            vf_filter = self._subtitles_filter(subtitles, keywords)
+            if color_grading:
+                vf_filter = f"{self.color_filter(color_grading)},{vf_filter}"
             
-            # Use proper path formatting for Windows
-            ass_path_str = str(ass_path).replace('\\', '/').replace(':', '\\:')
-            
-            (
-                ffmpeg
-                .input(video_path)
-                .output(
-                    str(output_file),
-                    vf=f"ass='{ass_path_str}'",
-                    acodec='copy',
-                    loglevel='error'
-                )
-                .overwrite_output()
-                .run()
-            )
+            run_encode((ffmpeg.input(video_path),), str(output_file), self.hwaccel, vf=vf_filter, acodec='copy')
             return str(output_file)
         except ffmpeg.Error as e:
             logger.error(f"FFmpeg error adding subtitles: {e.stderr.decode() if e.stderr else str(e)}")
             raise
 
+    def _subtitles_filter(self, subtitles: List[Dict], keywords: List[str] = None) -> str:
+        """Write the ASS file and return the -vf filter that burns it in"""
+        ass_path = self.create_ass(subtitles, keywords)
+        
+        # Use proper path formatting for Windows
+        ass_path_str = str(ass_path).replace('\\', '/').replace(':', '\\:')
+        return f"ass='{ass_path_str}'"
+
     def add_zoom_effects(self, video_path: str, highlights: List[Dict]) -> str:
         """Add dynamic zoom effects"""
         if not self.options.enable_zoom or not highlights:
             return video_path
             
-        output_file = self.temp_dir / "zoomed_output.mp4"
-        
-        # Simple zoom logic: Zoom in 1.15x over 0.5s at start of highlight
-        # Using zoompan filter
-        # Note: This is a simplified implementation. Complex zoompan can be tricky.
-        # We'll use a basic "punch in" effect for now.
-        
-        # Construct zoompan expression
-        # Default: zoom=1
-        # Highlight: zoom=1.15
-        
-        # We need to chain filters for multiple highlights, which is complex.
-        # Instead, we'll apply a generic "active camera" effect if there are highlights
-        # Or just one simple zoom for demonstration.
-        
-        # Let's try a simple approach: Zoom in slightly on ALL highlights
-        # zoompan=z='if(between(t,start,end),1.15,1)':d=1
-        
-        conditions = []
-        for h in highlights:
-            start = h['start']
-            end = h['end']
-            conditions.append(f"between(t,{start},{end})")
-            
-        if not conditions:
+        zoom_filter = self._zoom_filter(highlights)
+        if not zoom_filter:
             return video_path
             
-        # Simple approach: Apply zoom to entire video when highlights exist
-        # More sophisticated per-segment zoom would require complex filter_complex
+        output_file = self._temp_file("zoomed_output.mp4")
         
         try:
-            # Use a simple constant zoom for now (1.1x slight zoom)
-            # This avoids complex expression parsing issues
-            (
-                ffmpeg
-                .input(video_path)
-                .output(
-                    str(output_file),
-                    vf="zoompan=z='1.1':d=1:fps=30",
-                    acodec='copy',
-                    loglevel='error'
-                )
-                .overwrite_output()
-                .run()
-            )
+            run_encode((ffmpeg.input(video_path),), str(output_file), self.hwaccel, vf=zoom_filter, acodec='copy')
             return str(output_file)
         except ffmpeg.Error as e:
             logger.warning(f"Zoom effect failed, skipping: {e}")
             return video_path
 
-    def convert_aspect_ratio(self, video_path: str) -> str:
-        """Convert to 9:16 using Center Crop or Blur Background"""
+    def _zoom_filter(self, highlights: List[Dict]) -> Optional[str]:
+        """
+        -vf zoompan that punches in on the center during the highlights
+        
+        One expression for all highlights (summed between() terms), so any
+        number of them costs a single filter. None if no highlight is in
+        the video.
+        """
+        active = "+".join(
+            f"between(it,{h['start']},{h['end']})"
+            for h in highlights
+            if h['end'] > h['start'] and h['start'] < self.duration
+        )
+        if not active:
+            return None
+        
+        # d=1: one output frame per input frame, at the source size and rate
+        return (
+            f"zoompan=z='if({active},{HIGHLIGHT_ZOOM},1)':d=1"
+            ":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'"
+            f":s={self.width}x{self.height}:fps={self.fps}"
+        )
+
+    def convert_aspect_ratio(self, video_path: str, color_grading: Optional[str] = None) -> str:
+        """Convert to 9:16 using Center Crop or Blur Background (color grading first, if given)"""
         output_file = self.output_path
         
+        # Already 1080x1920 with nothing left to grade: both strategies would
+        # re-encode unchanged frames, so just remux
+        if not color_grading and self._is_target_size(video_path):
+            logger.info("Already 1080x1920, remuxing without re-encoding")
+            return self._remux(video_path, output_file)
+        
+        filters = [self.color_filter(color_grading)] if color_grading else []
+        
         try:
-            if self.options.aspect_ratio_strategy == "center_crop":
-                # Center Crop Strategy (Pro)
-                # 1. Scale height to 1920 (maintaining aspect ratio)
-                # 2. Crop to 1080x1920 (center)
-                
-                # Check current aspect ratio
-                current_ar = self.width / self.height
-                target_ar = 9 / 16
-                
-                if current_ar > target_ar:
-                    # Video is wider than target (e.g. 16:9 source -> 9:16 target)
-                    # Scale height to 1920, width will be > 1080
-                    vf_filter = 'scale=-1:1920,crop=1080:1920'
-                else:
-                    # Video is taller/narrower (unlikely for horizontal source)
-                    # Scale width to 1080, height will be > 1920
-                    vf_filter = 'scale=1080:-1,crop=1080:1920'
-                
-                # Use simple output with vf and acodec copy
-                (
-                    ffmpeg
-                    .input(video_path)
-                    .output(str(output_file), vf=vf_filter, acodec='copy', loglevel='error')
-                    .overwrite_output()
-                    .run()
-                )
-                
-            else:
-                # Blur Background Strategy (Old School)
-                # Need to use filter_complex to properly handle audio
-                input_stream = ffmpeg.input(video_path)
-                
-                # Background: Scale to fill -> Boxblur
-                bg = (
-                    input_stream
-                    .filter('scale', 1080, 1920)
-                    .filter('boxblur', luma_radius='min(h,w)/20', luma_power=1)
-                    .filter('setsar', 1)
-                )
-                
-                # Foreground: Scale to fit width
-                fg = (
-                    input_stream
-                    .filter('scale', 1080, -1)
-                )
-                
-                # Overlay video
-                overlayed = ffmpeg.overlay(bg, fg, x='(W-w)/2', y='(H-h)/2')
-                
-                # Output with audio from original input
-                output = ffmpeg.output(
-                    overlayed, 
-                    input_stream.audio,
-                    str(output_file), 
-                    loglevel='error'
-                )
-                ffmpeg.run(output, overwrite_output=True)
-                
+            # Center Crop (Pro) or Blur Background (Old School), audio copied
+            run_encode(
+                (ffmpeg.input(video_path),), str(output_file), self.hwaccel,
+                acodec='copy', movflags='+faststart', **self._aspect_filter_args(filters)
+            )
             return str(output_file)
             
         except ffmpeg.Error as e:
             logger.error(f"FFmpeg error converting aspect ratio: {e.stderr.decode() if e.stderr else str(e)}")
             raise
+
+    def _aspect_filter_args(self, filters: List[str]) -> Dict[str, str]:
+        """Output option (-vf or -filter_complex) applying `filters`, then the 9:16 conversion"""
+        if self.options.aspect_ratio_strategy == "center_crop":
+            return {'vf': ",".join([*filters, self._center_crop_filter()])}
+        return {'filter_complex': self._blur_background_graph(filters)}
+
+    def _blur_background_graph(self, filters: List[str]) -> str:
+        """
+        -filter_complex graph: `filters`, then the video fit to 1080 wide over
+        a blurred, stretched copy of itself
+        
+        Its output is unlabeled, so FFmpeg maps it (and the input's audio)
+        automatically.
+        """
+        chain = ",".join([*filters, "split[main][bgsrc]"])
+        return (
+            f"[0:v]{chain};"
+            # Background: Scale to fill -> Boxblur
+            # Blurred at 1/5.625 size and scaled back up: the blur only
+            # keeps low frequencies, so it looks the same at ~3% of the
+            # pixels (the radius is relative, so it scales with the frame)
+            "[bgsrc]scale=192:342,boxblur=luma_radius=min(h\\,w)/20:luma_power=1,"
+            "scale=1080:1920:flags=bilinear,setsar=1[bg];"
+            # Foreground: Scale to fit width
+            "[main]scale=1080:-1[fg];"
+            "[bg][fg]overlay=(W-w)/2:(H-h)/2"
+        )
+
+    def _center_crop_filter(self) -> str:
+        """-vf chain that center crops to 9:16 and scales to 1080x1920"""
+        # Crop in input pixels first so the scaler only works on what
+        # is kept (setsar: crop rounding skews the sample aspect ratio)
+        if self.width / self.height > 9 / 16:
+            # Video is wider than target (e.g. 16:9 source -> 9:16 target)
+            # Crop width to 9:16 of the height
+            return 'crop=trunc(ih*9/16/2)*2:ih,scale=1080:1920,setsar=1'
+        # Video is taller/narrower (unlikely for horizontal source)
+        # Crop height to 16:9 of the width
+        return 'crop=iw:trunc(iw*16/9/2)*2,scale=1080:1920,setsar=1'
+
+    def process_all(self, jump_cuts: List[Dict], subtitles: List[Dict], keywords: List[str] = None,
+                    highlights: List[Dict] = None) -> str:
+        """
+        Jump cuts, zoom, color grading, subtitles and 9:16 conversion in one FFmpeg pass
+
+        Same filters, in the same order, as the step-by-step methods, but the
+        source is decoded and encoded once.
+        """
+        filters = []
+        output_kwargs = {}
+        
+        # Snapped cuts keep extra frames; move what's timed after them along
+        subtitles = self.align_to_cuts(jump_cuts, subtitles)
+        highlights = self.align_to_cuts(jump_cuts, highlights)
+        
+        if jump_cuts:
+            select_expr = self._select_expr(jump_cuts)
+            filters.append(f"select='{select_expr}',setpts=N/FRAME_RATE/TB,fps={self.fps}")
+            output_kwargs['af'] = f"aselect='{select_expr}',asetpts=N/SR/TB"
+        else:
+            output_kwargs['acodec'] = 'copy'
+        
+        zoom_filter = self._zoom_filter(highlights) if self.options.enable_zoom and highlights else None
+        if zoom_filter:
+            filters.append(zoom_filter)
+        
+        if self.options.color_grading:
+            filters.append(self.color_filter(self.options.color_grading))
+        
+        if subtitles:
+            filters.append(self._subtitles_filter(subtitles, keywords))
+        
+        if not filters and self._is_target_size(self.input_path):
+            # Nothing to cut, grade or burn in, and already 1080x1920
+            logger.info("Nothing to render, remuxing without re-encoding")
+            return self._remux(self.input_path, self.output_path)
+        
+        output_kwargs.update(self._aspect_filter_args(filters))
+        
+        try:
+            run_encode(
+                (ffmpeg.input(str(self.input_path)),),
+                str(self.output_path),
+                self.hwaccel,
+                movflags='+faststart',
+                **output_kwargs
+            )
+            return str(self.output_path)
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error in single-pass processing: {e.stderr.decode() if e.stderr else str(e)}")
+            raise
+
+    def _is_target_size(self, video_path) -> bool:
+        """Whether a video is already the 1080x1920 output size"""
+        video_info = probe_video(video_path)
+        return (video_info['width'], video_info['height']) == (TARGET_WIDTH, TARGET_HEIGHT)
+
+    def _remux(self, video_path, output_file: Path) -> str:
+        """Copy the streams into the output file (faststart), without re-encoding"""
+        try:
+            run_ffmpeg(
+                ffmpeg
+                .input(str(video_path))
+                .output(str(output_file), c='copy', movflags='+faststart', loglevel='error')
+                .overwrite_output()
+            )
+            return str(output_file)
+        except ffmpeg.Error as e:
+            logger.error(f"FFmpeg error remuxing: {e.stderr.decode() if e.stderr else str(e)}")
+            raise